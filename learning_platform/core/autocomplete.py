@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+
+from .caching import LRUCache, get_course_generation
+from .models import Course
+
+
+# Hot prefixes are served from memory; entries are keyed by the course generation
+# so any course write (see signals.py) makes every cached prefix stale at once.
+_prefix_cache = LRUCache(
+    maxsize=settings.COURSE_AUTOCOMPLETE_CACHE_SIZE,
+    ttl=settings.COURSE_AUTOCOMPLETE_CACHE_TTL,
+)
+
+
+def normalize_prefix(query):
+    return " ".join(query.lower().split())
+
+
+def suggest_courses(query, limit=None):
+    limit = limit or settings.COURSE_AUTOCOMPLETE_LIMIT
+    prefix = normalize_prefix(query)
+    if not prefix:
+        return []
+
+    key = (get_course_generation(), prefix, limit)
+    suggestions = _prefix_cache.get(key)
+    if suggestions is None:
+        suggestions = _query_suggestions(prefix, limit)
+        _prefix_cache.set(key, suggestions)
+    return suggestions
+
+
+def _query_suggestions(prefix, limit):
+    # trigram_word_similar compiles to the %> operator, which course_title_trgm_idx
+    # (gin_trgm_ops) can serve; it matches partial words and tolerates typos.
+    queryset = (
+        Course.objects.filter(is_active=True, title__trigram_word_similar=prefix)
+        .annotate(similarity=TrigramWordSimilarity(prefix, "title"))
+        .order_by("-similarity", "title")
+        .values("id", "title")[:limit]
+    )
+    return list(queryset)
@@ -0,0 +1,235 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+
+logger = logging.getLogger(__name__)
+
+
+COURSE_GENERATION_KEY = "course_generation"
+
+
+def get_course_generation():
+    # Cheap version stamp for anything derived from Course rows (one Redis GET)
+    generation = cache.get(COURSE_GENERATION_KEY)
+    if generation is None:
+        cache.add(COURSE_GENERATION_KEY, 1, timeout=None)
+        generation = cache.get(COURSE_GENERATION_KEY, 1)
+    return generation
+
+
+def bump_course_generation():
+    try:
+        return cache.incr(COURSE_GENERATION_KEY)
+    except ValueError:  # key missing (evicted / fresh Redis)
+        cache.add(COURSE_GENERATION_KEY, 1, timeout=None)
+        return cache.incr(COURSE_GENERATION_KEY)
+
+
+INSTRUCTOR_PROFILES_KEY = "instructor_profiles_changed_at"
+
+
+def get_instructor_profiles_changed_at():
+    # When an instructor profile embedded in course payloads last changed; part of
+    # the course list/detail HTTP validators (one Redis GET)
+    changed_at = cache.get(INSTRUCTOR_PROFILES_KEY)
+    if changed_at is None:
+        # Unknown (evicted / fresh Redis): assume just now, so validators move on
+        # rather than risk a stale 304
+        cache.add(INSTRUCTOR_PROFILES_KEY, time.time(), timeout=None)
+        changed_at = cache.get(INSTRUCTOR_PROFILES_KEY, time.time())
+    return datetime.fromtimestamp(changed_at, tz=dt_timezone.utc)
+
+
+def touch_instructor_profiles():
+    cache.set(INSTRUCTOR_PROFILES_KEY, time.time(), timeout=None)
+
+
+class LRUCache:
+    """Bounded, thread-safe per-process LRU with a per-entry TTL."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TwoLevelCache:
+    """
+    Per-process LRU (L1, short TTL) in front of the Redis cache (L2).
+
+    invalidate() bumps the key's L2 version and publishes the key on a Redis
+    pub/sub channel; every process runs a daemon subscriber thread that evicts it
+    from its own L1. If the subscription drops, L1 is cleared (messages may have
+    been missed) and the L1 TTL bounds staleness until it reconnects.
+
+    A reader that loaded the row before a write committed stores its result under
+    the version it read beforehand, so a late write can't bring back an entry that
+    was invalidated in the meantime (same for L1, via the eviction counter).
+    """
+
+    def __init__(self, name, l1_size, l1_ttl, l2_ttl):
+        self.name = name
+        self.channel = f"{name}:invalidate"
+        self.l1 = LRUCache(maxsize=l1_size, ttl=l1_ttl)
+        self.l2_ttl = l2_ttl
+        self.counters = {"l1_hits": 0, "l2_hits": 0, "misses": 0}
+        self._evictions = 0
+        self._subscriber_pid = None
+        self._lock = threading.Lock()
+
+    def version_key(self, key):
+        return f"{self.name}:{key}:version"
+
+    def get_version(self, key):
+        version = cache.get(self.version_key(key))
+        if version is None:
+            # Never restart at a number an older (evicted) version key may have used
+            cache.add(self.version_key(key), time.time_ns(), timeout=None)
+            version = cache.get(self.version_key(key))
+        return version
+
+    def l2_key(self, key, version):
+        return f"{self.name}:{key}:{version}"
+
+    def get(self, key, loader):
+        """Return the cached value for `key`, calling `loader()` on a full miss."""
+        self._ensure_subscriber()
+        key = str(key)
+        value = self.l1.get(key)
+        if value is not None:
+            self._count("l1_hits")
+            return value
+        evictions = self._evictions
+        l2_key = self.l2_key(key, self.get_version(key))
+        value = cache.get(l2_key)
+        if value is not None:
+            self._count("l2_hits")
+        else:
+            self._count("misses")
+            value = loader()
+            if value is None:
+                return None
+            cache.set(l2_key, value, self.l2_ttl)
+        if evictions == self._evictions:
+            self.l1.set(key, value)
+        return value
+
+    def invalidate(self, *keys):
+        keys = [str(key) for key in keys]
+        for key in keys:
+            self._evict(key)
+            try:
+                cache.incr(self.version_key(key))
+            except ValueError:  # no version yet: nothing cached under one either
+                pass
+        try:
+            client = get_redis_connection("default")
+            for key in keys:
+                client.publish(self.channel, key)
+        except RedisError:
+            logger.warning("Could not broadcast %s invalidation", self.name)
+
+    def _evict(self, key=None):
+        with self._lock:
+            self._evictions += 1
+        if key is None:
+            self.l1.clear()
+        else:
+            self.l1.delete(key)
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = sum(counters.values())
+        l2_lookups = lookups - counters["l1_hits"]
+        return {
+            "pid": os.getpid(),
+            "l1_size": len(self.l1),
+            **counters,
+            "l1_hit_ratio": counters["l1_hits"] / lookups if lookups else None,
+            "l2_hit_ratio": counters["l2_hits"] / l2_lookups if l2_lookups else None,
+        }
+
+    def _ensure_subscriber(self):
+        # Checked per pid: threads don't survive a fork into worker processes
+        if self._subscriber_pid == os.getpid():
+            return
+        with self._lock:
+            if self._subscriber_pid == os.getpid():
+                return
+            self._subscriber_pid = os.getpid()
+            threading.Thread(
+                target=self._listen, name=f"{self.name}-invalidation", daemon=True
+            ).start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = get_redis_connection("default").pubsub(
+                    ignore_subscribe_messages=True
+                )
+                pubsub.subscribe(self.channel)
+                self._evict()  # anything published before we subscribed is lost
+                while True:
+                    # get_message polls with its own timeout, so an idle channel
+                    # doesn't trip the client's SOCKET_TIMEOUT
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self._evict(message["data"].decode())
+            except RedisError:
+                logger.warning("%s invalidation subscriber reconnecting", self.name)
+                self._evict()
+                time.sleep(1)
+
+
+# Serialized course detail payloads, keyed by course pk (see CourseViewSet.retrieve)
+course_detail_cache = TwoLevelCache(
+    "course_detail",
+    l1_size=settings.COURSE_DETAIL_L1_SIZE,
+    l1_ttl=settings.COURSE_DETAIL_L1_TTL,
+    l2_ttl=settings.COURSE_DETAIL_L2_TTL,
+)
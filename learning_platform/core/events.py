@@ -0,0 +1,270 @@
+import logging
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DataError, connection, transaction
+from django.utils import timezone
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError, ResponseError
+
+from .models import ActivityEvent
+
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_STREAM = "activity_events"
+ACTIVITY_GROUP = "activity_drain"
+ACTIVITY_CONSUMER = "drain"
+ACTIVITY_STATS_KEY = "activity_events:stats"
+ACTIVITY_DEAD_LETTER = "activity_events:dead"
+ACTIVITY_DEAD_LETTER_MAXLEN = 10_000
+
+# Events this process failed to hand to Redis (bounded-loss policy: drop, never block)
+dropped_locally = 0
+
+
+def record_events(events):
+    """
+    Append events to the Redis stream in one pipelined round-trip.
+
+    Never raises: if Redis is unavailable the batch is dropped and counted.
+    The stream is capped at ACTIVITY_STREAM_MAXLEN (approximate trimming), so
+    when the drain falls behind the oldest undrained events are lost rather
+    than Redis memory growing without bound.
+    """
+    global dropped_locally
+    if not events:
+        return 0
+    now_ms = int(timezone.now().timestamp() * 1000)
+    try:
+        pipe = get_redis_connection("default").pipeline(transaction=False)
+        for event in events:
+            pipe.xadd(
+                ACTIVITY_STREAM,
+                {
+                    "t": event["type"],
+                    "u": event["user"],
+                    "c": event["course"],
+                    "l": event.get("lesson") or "",
+                    "v": event.get("value", 0),
+                    "ts": now_ms,
+                },
+                maxlen=settings.ACTIVITY_STREAM_MAXLEN,
+                approximate=True,
+            )
+        pipe.hincrby(ACTIVITY_STATS_KEY, "ingested", len(events))
+        pipe.execute()
+    except RedisError:
+        dropped_locally += len(events)
+        logger.warning("Dropped %d activity events: Redis unavailable", len(events))
+        return 0
+    return len(events)
+
+
+def record_event(event_type, user, course, lesson=None, value=0):
+    return record_events(
+        [
+            {
+                "type": event_type,
+                "user": user,
+                "course": course,
+                "lesson": lesson,
+                "value": value,
+            }
+        ]
+    )
+
+
+def _to_event(fields):
+    fields = {key.decode(): value.decode() for key, value in fields.items()}
+    return ActivityEvent(
+        event_type=fields["t"],
+        user_id=int(fields["u"]),
+        course_id=int(fields["c"]),
+        lesson_id=int(fields["l"]) if fields["l"] else None,
+        value=int(fields["v"]),
+        occurred_at=datetime.fromtimestamp(int(fields["ts"]) / 1000, dt_timezone.utc),
+    )
+
+
+def store_events(messages):
+    """
+    bulk_create the events for a batch of stream messages and return the
+    messages that couldn't be stored.
+
+    If Postgres rejects the batch, it is retried one row at a time so a single
+    bad event can't wedge the drain (its batch would otherwise be re-read and
+    fail again on every run); the rows that still fail are returned for the
+    dead-letter stream.
+    """
+    events, rejected = [], []
+    for fields in messages:
+        try:
+            events.append((fields, _to_event(fields)))
+        except (KeyError, ValueError):
+            rejected.append(fields)
+    try:
+        with transaction.atomic():
+            ActivityEvent.objects.bulk_create([event for _, event in events])
+        return rejected
+    except DataError:
+        logger.warning("Activity batch rejected, storing row by row", exc_info=True)
+    with transaction.atomic():
+        for fields, event in events:
+            try:
+                with transaction.atomic():
+                    ActivityEvent.objects.bulk_create([event])
+            except DataError:
+                rejected.append(fields)
+    return rejected
+
+
+def drain_events(batch_size=None, max_batches=100):
+    """
+    Move events from the stream into ActivityEvent with bulk_create, a batch at
+    a time. Messages are only acked/deleted after their batch is committed, and
+    a crashed run's unacked batch is re-read first on the next run.
+    """
+    batch_size = batch_size or settings.ACTIVITY_DRAIN_BATCH
+    client = get_redis_connection("default")
+    try:
+        client.xgroup_create(ACTIVITY_STREAM, ACTIVITY_GROUP, id="0", mkstream=True)
+    except ResponseError:
+        pass  # BUSYGROUP: already exists
+
+    lock = cache.lock("activity_drain_lock", timeout=300)
+    if not lock.acquire(blocking=False):
+        return 0  # another worker is draining
+
+    drained = 0
+    try:
+        stream_id = "0"  # own pending (unacked) messages first, then new ones
+        for _ in range(max_batches):
+            response = client.xreadgroup(
+                ACTIVITY_GROUP,
+                ACTIVITY_CONSUMER,
+                {ACTIVITY_STREAM: stream_id},
+                count=batch_size,
+            )
+            messages = response[0][1] if response else []
+            if not messages:
+                if stream_id == "0":
+                    stream_id = ">"
+                    continue
+                break
+            ids = [message_id for message_id, _ in messages]
+            rejected = store_events([fields for _, fields in messages if fields])
+            pipe = client.pipeline(transaction=False)
+            for fields in rejected:
+                pipe.xadd(
+                    ACTIVITY_DEAD_LETTER,
+                    fields,
+                    maxlen=ACTIVITY_DEAD_LETTER_MAXLEN,
+                    approximate=True,
+                )
+            pipe.xack(ACTIVITY_STREAM, ACTIVITY_GROUP, *ids)
+            pipe.xdel(ACTIVITY_STREAM, *ids)
+            pipe.hincrby(ACTIVITY_STATS_KEY, "drained", len(ids) - len(rejected))
+            if rejected:
+                pipe.hincrby(ACTIVITY_STATS_KEY, "dead_lettered", len(rejected))
+            pipe.execute()
+            drained += len(ids)
+    finally:
+        lock.release()
+    return drained
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def create_month_partition(cursor, month):
+    """
+    Create the core_activityevent partition for `month` unless it exists.
+
+    Rows for that month already sitting in the default partition (written before
+    the partition existed) would make a plain CREATE ... PARTITION OF fail, so
+    they are moved into the new partition while the default one is detached.
+    """
+    following = next_month(month)
+    name = f"core_activityevent_{month:%Y_%m}"
+    cursor.execute("SELECT to_regclass(%s)", [name])
+    if cursor.fetchone()[0] is not None:
+        return None
+    bounds = [month, following]
+    cursor.execute(
+        "SELECT EXISTS (SELECT 1 FROM core_activityevent_default "
+        "WHERE occurred_at >= %s AND occurred_at < %s)",
+        bounds,
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute(
+            f"CREATE TABLE {name} PARTITION OF core_activityevent "
+            "FOR VALUES FROM (%s) TO (%s)",
+            bounds,
+        )
+        return name
+    cursor.execute(
+        "ALTER TABLE core_activityevent DETACH PARTITION core_activityevent_default"
+    )
+    cursor.execute(
+        f"CREATE TABLE {name} PARTITION OF core_activityevent "
+        "FOR VALUES FROM (%s) TO (%s)",
+        bounds,
+    )
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM core_activityevent_default "
+        "WHERE occurred_at >= %s AND occurred_at < %s RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved",
+        bounds,
+    )
+    cursor.execute(
+        "ALTER TABLE core_activityevent "
+        "ATTACH PARTITION core_activityevent_default DEFAULT"
+    )
+    return name
+
+
+def ensure_partitions(months_ahead=2):
+    """Create monthly partitions of core_activityevent up to `months_ahead` out."""
+    month = timezone.now().date().replace(day=1)
+    created = []
+    for _ in range(months_ahead + 1):
+        with transaction.atomic(), connection.cursor() as cursor:
+            name = create_month_partition(cursor, month)
+        if name:
+            created.append(name)
+        month = next_month(month)
+    return created
+
+
+def stream_metrics():
+    client = get_redis_connection("default")
+    stats = {
+        key.decode(): int(value)
+        for key, value in client.hgetall(ACTIVITY_STATS_KEY).items()
+    }
+    pending = lag = None
+    try:
+        for group in client.xinfo_groups(ACTIVITY_STREAM):
+            if group["name"] in (ACTIVITY_GROUP, ACTIVITY_GROUP.encode()):
+                pending, lag = group["pending"], group.get("lag")
+    except ResponseError:
+        pass  # stream not created yet
+    length = client.xlen(ACTIVITY_STREAM)
+    ingested, drained = stats.get("ingested", 0), stats.get("drained", 0)
+    dead_lettered = stats.get("dead_lettered", 0)
+    return {
+        "stream_length": length,
+        "stream_max_length": settings.ACTIVITY_STREAM_MAXLEN,
+        "pending": pending,
+        "lag": lag,
+        "ingested": ingested,
+        "drained": drained,
+        "dead_lettered": dead_lettered,
+        # Ingested events that are neither stored, dead-lettered nor still queued
+        # were trimmed
+        "trimmed": max(ingested - drained - dead_lettered - length, 0),
+        "dropped_by_this_process": dropped_locally,
+    }
@@ -0,0 +1,114 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import autocomplete
+from core.models import Course, User
+
+
+WORDS = (
+    "python django data science machine learning web development design "
+    "marketing finance photography music guitar piano writing business "
+    "javascript react cloud security networking statistics algebra calculus "
+    "physics chemistry biology spanish french drawing cooking fitness yoga"
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure suggest_courses latency for cold prefixes (trigram query) and "
+        "warm ones (per-process LRU) against the p99 target (needs PostgreSQL "
+        "with pg_trgm)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Create this many synthetic courses first (removed afterwards).",
+        )
+        parser.add_argument("--queries", type=int, default=2000)
+        parser.add_argument("--target-ms", type=float, default=10.0)
+        parser.add_argument("--keep", action="store_true")
+
+    def handle(self, *args, **options):
+        instructor = self.seed(options["seed"]) if options["seed"] else None
+        try:
+            if not Course.objects.filter(is_active=True).exists():
+                raise CommandError("No active courses to search; use --seed")
+            prefixes = self.prefixes(options["queries"])
+            limit = settings.COURSE_AUTOCOMPLETE_LIMIT
+
+            cold = []
+            for prefix in prefixes:
+                autocomplete._prefix_cache.clear()
+                cold.append(self.timed(prefix, limit))
+            warm = [self.timed(prefix, limit) for prefix in prefixes]
+        finally:
+            if instructor is not None and not options["keep"]:
+                instructor.delete()  # cascades to the generated courses
+
+        over_target = []
+        for name, timings in [("cold (trigram query)", cold), ("warm (LRU)", warm)]:
+            timings.sort()
+            p99 = timings[int(len(timings) * 0.99)]
+            self.stdout.write(
+                f"{name:<21} {len(timings)} lookups: "
+                f"mean {statistics.fmean(timings):.2f}ms, "
+                f"p50 {timings[len(timings) // 2]:.2f}ms, "
+                f"p99 {p99:.2f}ms, max {timings[-1]:.2f}ms"
+            )
+            if p99 > options["target_ms"]:
+                over_target.append(name)
+        if over_target:
+            raise CommandError(
+                f"p99 above {options['target_ms']}ms for: {', '.join(over_target)}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"p99 within {options['target_ms']}ms"))
+
+    def timed(self, prefix, limit):
+        start = time.perf_counter()
+        autocomplete.suggest_courses(prefix, limit)
+        return (time.perf_counter() - start) * 1000
+
+    def prefixes(self, count):
+        # What users type: the first 2-6 characters of a word from a real title
+        words = [
+            word
+            for title in Course.objects.filter(is_active=True).values_list(
+                "title", flat=True
+            )[:5000]
+            for word in title.lower().split()
+            if len(word) >= 2
+        ]
+        rng = random.Random(42)
+        return [
+            word[: rng.randint(2, min(len(word), 6))]
+            for word in rng.choices(words, k=count)
+        ]
+
+    def seed(self, count):
+        instructor = User.objects.create(
+            email=f"bench-autocomplete-{time.time_ns()}@example.com",
+            username=f"bench-autocomplete-{time.time_ns()}",
+            role="instructor",
+        )
+        rng = random.Random(7)
+        Course.objects.bulk_create(
+            [
+                Course(
+                    title=" ".join(rng.sample(WORDS, 3)).title() + f" {i}",
+                    description="Generated by manage.py bench_autocomplete",
+                    instructor=instructor,
+                    price=Decimal("0.00"),
+                )
+                for i in range(count)
+            ],
+            batch_size=5000,
+        )
+        return instructor
@@ -0,0 +1,91 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Course, User
+from core.renderers import FastJSONRenderer, orjson
+from core.serializers import CourseRowSerializer, CourseSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare CourseSerializer + JSONRenderer against the values()-row fast "
+        "path + FastJSONRenderer used by course list/search (in memory, no DB)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"orjson: {'yes' if orjson else 'no (stdlib json)'}")
+        self.stdout.write(f"{'rows':>8} {'drf ms':>10} {'fast ms':>10} {'speedup':>8}")
+        for size in options["sizes"]:
+            courses, rows = self.build(size)
+            baseline = JSONRenderer().render(CourseSerializer(courses, many=True).data)
+            fast = FastJSONRenderer().render(CourseRowSerializer(rows).data)
+            if baseline != fast:
+                raise CommandError(
+                    f"Output differs from CourseSerializer at {size} rows"
+                )
+
+            drf_ms = self.best_of(
+                options["repeat"],
+                lambda: JSONRenderer().render(
+                    CourseSerializer(courses, many=True).data
+                ),
+            )
+            fast_ms = self.best_of(
+                options["repeat"],
+                lambda: FastJSONRenderer().render(CourseRowSerializer(rows).data),
+            )
+            self.stdout.write(
+                f"{size:>8} {drf_ms:>10.2f} {fast_ms:>10.2f} {drf_ms / fast_ms:>7.1f}x"
+            )
+
+    def best_of(self, repeat, func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return min(timings)
+
+    def build(self, size):
+        now = timezone.now()
+        instructor = User(
+            id=1,
+            email="instructor@example.com",
+            username="instructor",
+            role="instructor",
+            bio="Teaches things — with “unicode”.",
+        )
+        courses, rows = [], []
+        for i in range(size):
+            course = Course(
+                id=i + 1,
+                title=f"Course {i}",
+                description="Lorem ipsum dolor sit amet. " * 8,
+                instructor=instructor,
+                price=Decimal("49.99"),
+                capacity=None if i % 2 else 30,
+                created_at=now - timedelta(days=i),
+                updated_at=now,
+            )
+            courses.append(course)
+            row = {
+                field: getattr(course, field)
+                for field in CourseRowSerializer.course_fields
+            }
+            row.update(
+                {
+                    f"instructor__{field}": getattr(instructor, field)
+                    for field in CourseRowSerializer.instructor_fields
+                }
+            )
+            rows.append(row)
+        return courses, rows
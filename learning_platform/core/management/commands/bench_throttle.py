@@ -0,0 +1,48 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from core.models import User
+from core.throttling import RoleRateThrottle
+
+
+class BenchView(APIView):
+    throttle_scope = "bench"
+
+
+class Command(BaseCommand):
+    help = "Measure the per-request latency RoleRateThrottle adds (needs Redis)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=10000)
+        parser.add_argument("--users", type=int, default=100)
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        requests = []
+        for i in range(options["users"]):
+            request = Request(factory.get("/api/courses/search/"))
+            request.user = User(id=10_000_000 + i, role="student")
+            requests.append(request)
+        view = BenchView()
+
+        RoleRateThrottle().allow_request(requests[0], view)  # load the script
+        timings = []
+        for i in range(options["requests"]):
+            request = requests[i % len(requests)]
+            start = time.perf_counter()
+            RoleRateThrottle().allow_request(request, view)
+            timings.append((time.perf_counter() - start) * 1_000_000)
+
+        timings.sort()
+        self.stdout.write(
+            f"{len(timings)} checks: "
+            f"mean {statistics.fmean(timings):.0f}us, "
+            f"p50 {timings[len(timings) // 2]:.0f}us, "
+            f"p99 {timings[int(len(timings) * 0.99)]:.0f}us, "
+            f"max {timings[-1]:.0f}us"
+        )
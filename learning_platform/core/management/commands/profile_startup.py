@@ -0,0 +1,87 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Runs in a fresh interpreter so nothing is already imported
+STARTUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import django
+django.setup()
+setup_done = time.perf_counter()
+from django.test import Client
+response = Client().get({path!r}, HTTP_HOST="localhost")
+first_response = time.perf_counter()
+print(json.dumps({{
+    "setup_ms": (setup_done - start) * 1000,
+    "first_request_ms": (first_response - setup_done) * 1000,
+    "status": response.status_code,
+}}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile cold start in a fresh process: per-module import time "
+        "(python -X importtime), django.setup() time and time to the first request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/api/courses/")
+        parser.add_argument("--top", type=int, default=25)
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-X",
+                "importtime",
+                "-c",
+                STARTUP_SCRIPT.format(path=options["path"]),
+            ],
+            capture_output=True,
+            text=True,
+            env=os.environ.copy(),
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr[-2000:])
+
+        modules = []
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "[us]" in line:
+                continue
+            self_us, cumulative_us, name = line[len("import time:") :].split("|")
+            modules.append((name.strip(), int(self_us), int(cumulative_us)))
+
+        packages = defaultdict(int)
+        for name, self_us, _ in modules:
+            packages[name.split(".")[0]] += self_us
+
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        total_ms = timings["setup_ms"] + timings["first_request_ms"]
+        self.stdout.write(
+            f"django.setup(): {timings['setup_ms']:.0f} ms, first request "
+            f"({options['path']} -> {timings['status']}): "
+            f"{timings['first_request_ms']:.0f} ms, total {total_ms:.0f} ms"
+        )
+        self.stdout.write(
+            f"{len(modules)} modules imported, "
+            f"{sum(m[1] for m in modules) / 1000:.0f} ms import time\n"
+        )
+
+        self.stdout.write(f"Top {options['top']} packages by import time:")
+        for package, self_us in sorted(packages.items(), key=lambda p: -p[1])[
+            : options["top"]
+        ]:
+            self.stdout.write(f"{self_us / 1000:>10.1f} ms  {package}")
+
+        self.stdout.write(f"\nTop {options['top']} modules by cumulative time:")
+        for name, _, cumulative_us in sorted(modules, key=lambda m: -m[2])[
+            : options["top"]
+        ]:
+            self.stdout.write(f"{cumulative_us / 1000:>10.1f} ms  {name}")
@@ -0,0 +1,85 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.models import Course, Seat, User
+from core.seats import SeatUnavailable, take_seat
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire N parallel seat claims at a limited-capacity course and verify that "
+        "no more seats than its capacity are sold (needs PostgreSQL)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--capacity", type=int, default=100)
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--workers", type=int, default=50)
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the generated course and users."
+        )
+
+    def handle(self, *args, **options):
+        capacity, requests = options["capacity"], options["requests"]
+        instructor = User.objects.create(
+            email=f"contention-{time.time_ns()}@example.com",
+            username=f"contention-{time.time_ns()}",
+            role="instructor",
+        )
+        course = Course.objects.create(
+            title="Seat contention run",
+            description="Generated by manage.py seat_contention",
+            instructor=instructor,
+            price=Decimal("0.00"),
+            capacity=capacity,
+        )
+        students = User.objects.bulk_create(
+            [
+                User(
+                    email=f"contention-{course.id}-{i}@example.com",
+                    username=f"contention-{course.id}-{i}",
+                    role="student",
+                )
+                for i in range(requests)
+            ]
+        )
+
+        def claim(student):
+            try:
+                take_seat(course, student)
+                return True
+            except SeatUnavailable:
+                return False
+            finally:
+                connection.close()  # each worker thread has its own connection
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            results = list(pool.map(claim, students))
+        elapsed = time.perf_counter() - start
+
+        sold = Seat.objects.filter(course=course, status="taken").count()
+        holders = (
+            Seat.objects.filter(course=course, status="taken")
+            .values("holder")
+            .distinct()
+            .count()
+        )
+        self.stdout.write(
+            f"{requests} claims in {elapsed:.2f}s: {sum(results)} succeeded, "
+            f"{sold} seats taken by {holders} students (capacity {capacity})"
+        )
+
+        if not options["keep"]:
+            User.objects.filter(pk__in=[s.pk for s in students]).delete()
+            instructor.delete()  # cascades to the course and its seats
+
+        if sold > capacity or holders != sold or sum(results) != sold:
+            raise CommandError("Oversell detected")
+        if sold < min(capacity, requests):
+            raise CommandError("Seats left unsold while claims were rejected")
+        self.stdout.write(self.style.SUCCESS("No oversell"))
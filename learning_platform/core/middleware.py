@@ -0,0 +1,39 @@
+import time
+
+from .events import record_event
+
+
+class CourseApiActivityMiddleware:
+    """
+    Record an `api_request` activity event for each successful authenticated
+    request to a course route (/api/courses/<pk>/...). The value is the response
+    time in milliseconds. Goes through the same Redis stream as client events, so
+    it adds one pipelined XADD and never blocks or fails the response.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        match = request.resolver_match
+        if (
+            match is not None
+            and match.url_name
+            and match.url_name.startswith("courses-")
+            and "pk" in match.kwargs
+            and response.status_code < 400
+            and request.user.is_authenticated  # set by DRF auth inside the view
+        ):
+            try:
+                course_id = int(match.kwargs["pk"])
+            except ValueError:
+                return response
+            record_event(
+                "api_request",
+                request.user.id,
+                course_id,
+                value=int((time.perf_counter() - start) * 1000),
+            )
+        return response
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-19 17:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_course_title_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='Seat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('available', 'Available'), ('reserved', 'Reserved'), ('taken', 'Taken')], default='available', max_length=20)),
+                ('reserved_until', models.DateTimeField(blank=True, null=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seats', to='core.course')),
+                ('holder', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='seats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['course', 'status'], name='core_seat_course__28f6d2_idx'), models.Index(condition=models.Q(('status', 'reserved')), fields=['reserved_until'], name='reserved_seats_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('holder__isnull', False)), fields=('course', 'holder'), name='one_seat_per_holder')],
+            },
+        ),
+    ]
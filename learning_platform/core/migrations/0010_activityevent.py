@@ -0,0 +1,79 @@
+# Generated by Django 5.2.1 on 2026-10-19 17:27
+
+from django.db import migrations, models
+
+
+# Range-partitioned by month on occurred_at; the primary key has to include the
+# partition key. Monthly partitions are created ahead of time by the
+# ensure_activity_partitions task; anything else lands in the default partition.
+CREATE_PARTITIONED_TABLE = """
+CREATE TABLE core_activityevent (
+    id bigint GENERATED BY DEFAULT AS IDENTITY,
+    event_type varchar(20) NOT NULL,
+    user_id bigint NOT NULL,
+    course_id bigint NOT NULL,
+    lesson_id bigint NULL,
+    value integer NOT NULL,
+    occurred_at timestamp with time zone NOT NULL,
+    PRIMARY KEY (id, occurred_at)
+) PARTITION BY RANGE (occurred_at);
+CREATE TABLE core_activityevent_default PARTITION OF core_activityevent DEFAULT;
+CREATE INDEX activity_course_time_idx ON core_activityevent (course_id, occurred_at);
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0009_section_lesson_progress"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    CREATE_PARTITIONED_TABLE,
+                    reverse_sql="DROP TABLE core_activityevent CASCADE;",
+                ),
+            ],
+            state_operations=[
+                migrations.CreateModel(
+                    name="ActivityEvent",
+                    fields=[
+                        (
+                            "id",
+                            models.BigAutoField(
+                                auto_created=True,
+                                primary_key=True,
+                                serialize=False,
+                                verbose_name="ID",
+                            ),
+                        ),
+                        (
+                            "event_type",
+                            models.CharField(
+                                choices=[
+                                    ("lesson_view", "Lesson view"),
+                                    ("watch_time", "Watch time"),
+                                    ("api_request", "API request"),
+                                ],
+                                max_length=20,
+                            ),
+                        ),
+                        ("user_id", models.BigIntegerField()),
+                        ("course_id", models.BigIntegerField()),
+                        ("lesson_id", models.BigIntegerField(blank=True, null=True)),
+                        ("value", models.IntegerField(default=0)),
+                        ("occurred_at", models.DateTimeField()),
+                    ],
+                    options={
+                        "indexes": [
+                            models.Index(
+                                fields=["course_id", "occurred_at"],
+                                name="activity_course_time_idx",
+                            )
+                        ],
+                    },
+                ),
+            ],
+        ),
+    ]
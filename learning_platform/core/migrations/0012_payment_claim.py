@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-19 17:41
+
+from django.db import migrations, models
+
+
+def blank_ids_to_null(apps, schema_editor):
+    # Failed payments used to store "" (and so collided on the unique index)
+    Payment = apps.get_model("core", "Payment")
+    Payment.objects.filter(stripe_payment_id="").update(stripe_payment_id=None)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0011_provisioningjob"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="payment",
+            name="stripe_payment_id",
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.RunPython(blank_ids_to_null, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="payment",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status__in", ["pending", "completed"])),
+                fields=("user", "course"),
+                name="one_open_payment_per_course",
+            ),
+        ),
+    ]
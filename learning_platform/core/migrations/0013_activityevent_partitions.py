@@ -0,0 +1,63 @@
+from datetime import date
+
+from django.db import migrations
+from django.utils import timezone
+
+
+# Same steps as core.events.create_month_partition at the time of writing, kept
+# inline so later changes to that helper don't change this migration. Rows for
+# the month already in the default partition are moved into the new one.
+CREATE_MONTH_PARTITION = """
+DO $$
+BEGIN
+    IF to_regclass('{name}') IS NOT NULL THEN
+        RETURN;
+    END IF;
+    IF EXISTS (
+        SELECT 1 FROM core_activityevent_default
+        WHERE occurred_at >= '{start}' AND occurred_at < '{end}'
+    ) THEN
+        ALTER TABLE core_activityevent DETACH PARTITION core_activityevent_default;
+        CREATE TABLE {name} PARTITION OF core_activityevent
+            FOR VALUES FROM ('{start}') TO ('{end}');
+        WITH moved AS (
+            DELETE FROM core_activityevent_default
+            WHERE occurred_at >= '{start}' AND occurred_at < '{end}'
+            RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved;
+        ALTER TABLE core_activityevent
+            ATTACH PARTITION core_activityevent_default DEFAULT;
+    ELSE
+        CREATE TABLE {name} PARTITION OF core_activityevent
+            FOR VALUES FROM ('{start}') TO ('{end}');
+    END IF;
+END
+$$;
+"""
+
+
+def create_current_partitions(apps, schema_editor):
+    # The drain starts writing as soon as workers are up, long before the daily
+    # ensure_activity_partitions run; give this month and next their partitions now
+    month = timezone.now().date().replace(day=1)
+    for _ in range(2):
+        following = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+        schema_editor.execute(
+            CREATE_MONTH_PARTITION.format(
+                name=f"core_activityevent_{month:%Y_%m}",
+                start=month.isoformat(),
+                end=following.isoformat(),
+            )
+        )
+        month = following
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0012_payment_claim"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_current_partitions, migrations.RunPython.noop),
+    ]
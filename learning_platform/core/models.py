@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.fields import ArrayField
 from django.contrib.postgres.search import SearchVectorField
 from django.contrib.postgres.indexes import GinIndex
 
@@ -36,6 +37,9 @@ class Course(models.Model):
         related_name="courses",
     )
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    capacity = models.PositiveIntegerField(
+        null=True, blank=True
+    )  # None means unlimited seats; otherwise enrollment goes through Seat
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)  # Added for partial indexing
@@ -53,12 +57,97 @@ class Course(models.Model):
             ),  # Partial index on title where is_active=True optimizes queries like Course.objects.filter(is_active=True, title__icontains='Python').
             # condition=Q(is_active=True) creates a index with WHERE is_active=true.
             GinIndex(fields=["search_vector"], name="course_search_idx"),
+            GinIndex(
+                fields=["title"],
+                name="course_title_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),  # pg_trgm index for fuzzy/as-you-type title matching (autocomplete)
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class Section(models.Model):
+    course = models.ForeignKey(
+        Course, on_delete=models.CASCADE, related_name="sections"
+    )
+    title = models.CharField(max_length=250)
+    order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["order", "id"]
+        indexes = [
+            models.Index(fields=["course", "order"]),  # for course outlines
+        ]
+
+    def __str__(self):
+        return f"{self.course.title}: {self.title}"
+
+
+class Lesson(models.Model):
+    section = models.ForeignKey(
+        Section, on_delete=models.CASCADE, related_name="lessons"
+    )
+    course = models.ForeignKey(
+        Course, on_delete=models.CASCADE, related_name="lessons"
+    )  # denormalized from section so outlines/progress don't need the join
+    title = models.CharField(max_length=250)
+    body = models.TextField(blank=True)  # only loaded when a lesson is opened
+    order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["order", "id"]
+        indexes = [
+            models.Index(fields=["course", "order"]),  # outline without the body
         ]
 
     def __str__(self):
         return self.title
 
 
+class Seat(models.Model):
+    # Pre-created seat pool for limited-capacity courses; reservations grab a row with
+    # SELECT ... FOR UPDATE SKIP LOCKED so concurrent buyers never wait on each other.
+    STATUS_CHOICES = (
+        ("available", "Available"),
+        ("reserved", "Reserved"),
+        ("taken", "Taken"),
+    )
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="seats")
+    holder = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="seats",
+    )
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default="available"
+    )
+    reserved_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["course", "status"]),  # free seat lookup
+            models.Index(
+                fields=["reserved_until"],
+                condition=models.Q(status="reserved"),
+                name="reserved_seats_idx",
+            ),  # expiry sweep only touches reserved seats
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["course", "holder"],
+                condition=models.Q(holder__isnull=False),
+                name="one_seat_per_holder",
+            ),  # a double-submitted reservation can't take two seats
+        ]
+
+    def __str__(self):
+        return f"Seat {self.pk} of {self.course_id} ({self.status})"
+
+
 class Enrollment(models.Model):
     student = models.ForeignKey(
         User,
@@ -79,6 +168,8 @@ class Enrollment(models.Model):
         ),
         default="active",
     )
+    # Completed lesson ids in one array per enrollment instead of a row per lesson
+    completed_lessons = ArrayField(models.BigIntegerField(), default=list, blank=True)
 
     class Meta:
         indexes = [
@@ -96,7 +187,10 @@ class Payment(models.Model):
         Course, on_delete=models.CASCADE, related_name="payments"
     )
     amount = models.DecimalField(max_digits=10, decimal_places=2)
-    stripe_payment_id = models.CharField(max_length=100, unique=True)
+    # Null until the charge succeeds (the pending row is the checkout claim)
+    stripe_payment_id = models.CharField(
+        max_length=100, unique=True, null=True, blank=True
+    )
     status = models.CharField(
         max_length=20,
         choices=(
@@ -113,6 +207,13 @@ class Payment(models.Model):
             models.Index(fields=["user", "created_at"]),  # for user payment history
             models.Index(fields=["stripe_payment_id"]),  # for fast stripe lookups
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "course"],
+                condition=models.Q(status__in=["pending", "completed"]),
+                name="one_open_payment_per_course",
+            ),  # concurrent checkouts for the same course can't both charge
+        ]
 
     def __str__(self):
         return f"{self.user.email} paid {self.amount} for {self.course.title}"
@@ -122,7 +223,7 @@ class Review(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="reviews")
     student = models.ForeignKey(
         User,
-        on_delete=models.CASCADE(),
+        on_delete=models.CASCADE,
         related_name="reviews",
         limit_choices_to={"role": "student"},
     )
@@ -140,3 +241,60 @@ class Review(models.Model):
         return (
             f"{self.student.email} reviewed {self.course.title} ({self.rating} stars)"
         )
+
+
+class ActivityEvent(models.Model):
+    # Append-only log written in batches by core.events.drain_events. The table is
+    # range-partitioned by month on occurred_at (see migration 0010), so it has
+    # plain id columns instead of foreign keys.
+    EVENT_TYPES = (
+        ("lesson_view", "Lesson view"),
+        ("watch_time", "Watch time"),
+        ("api_request", "API request"),
+    )
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPES)
+    user_id = models.BigIntegerField()
+    course_id = models.BigIntegerField()
+    lesson_id = models.BigIntegerField(null=True, blank=True)
+    value = models.IntegerField(default=0)  # e.g. seconds watched
+    occurred_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["course_id", "occurred_at"], name="activity_course_time_idx"
+            ),  # per-course stats over a time window
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} by {self.user_id} on {self.course_id}"
+
+
+class ProvisioningJob(models.Model):
+    # Bulk user import processed in chunks by core.tasks.provision_users; `processed`
+    # is the resume cursor and is committed together with each chunk's users
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    )
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="provisioning_jobs",
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    rows = models.JSONField(default=list)  # email/username/role/bio only, no passwords
+    course_ids = ArrayField(models.BigIntegerField(), default=list, blank=True)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Provisioning job {self.pk} ({self.processed}/{self.total})"
@@ -0,0 +1,19 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+@lru_cache(maxsize=None)
+def get_stripe():
+    """
+    Import and configure the Stripe SDK on first use. Workers, management
+    commands and Celery processes that never charge a card don't pay for it,
+    and a missing key only fails the payment request instead of startup.
+    """
+    if not settings.STRIPE_SECRET_KEY:
+        raise ImproperlyConfigured("STRIPE_SECRET_KEY is not set.")
+    import stripe
+
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    return stripe
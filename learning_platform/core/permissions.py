@@ -1,4 +1,7 @@
+from django.core.cache import cache
 from rest_framework.permissions import BasePermission
+from .models import Course, Enrollment
+from .caching import get_course_generation
 
 
 class IsInstructor(BasePermission):
@@ -14,3 +17,40 @@ class IsAdmin(BasePermission):
 class IsStudent(BasePermission):
     def has_permission(self, request, view):
         return request.user.is_authenticated and request.user.role == "student"
+
+
+class CanViewLesson(BasePermission):
+    # Lesson bodies are for enrolled students, the course instructor and admins
+    def has_object_permission(self, request, view, obj):
+        if request.user.role == "admin":
+            return True
+        if request.user.role == "instructor":
+            return obj.course.instructor_id == request.user.id
+        return Enrollment.objects.filter(
+            student=request.user,
+            course_id=obj.course_id,
+            status__in=["active", "completed"],
+        ).exists()
+
+
+def get_instructor_course_ids(user_id):
+    # Keyed by the course generation, so any course write invalidates every set
+    key = f"instructor_course_ids:{get_course_generation()}:{user_id}"
+    course_ids = cache.get(key)
+    if course_ids is None:
+        course_ids = set(
+            Course.objects.filter(instructor_id=user_id).values_list("id", flat=True)
+        )
+        cache.set(key, course_ids, 60 * 15)
+    return course_ids
+
+
+def authorize_course_ids(user, course_ids):
+    """Split course_ids into (allowed, denied) sets for writes by `user` in one pass."""
+    course_ids = set(course_ids)
+    if user.role == "admin":
+        return course_ids, set()
+    if user.role != "instructor":
+        return set(), course_ids
+    owned = get_instructor_course_ids(user.pk)
+    return course_ids & owned, course_ids - owned
@@ -0,0 +1,32 @@
+from django.db import transaction
+
+from .models import Enrollment, Lesson
+
+
+def record_progress(student, course, lesson_ids):
+    """
+    Merge a batch of completed lessons into the enrollment in one locked UPDATE
+    and flip it to "completed" once every lesson of the course is done.
+    Returns the updated enrollment, or None if the student isn't enrolled.
+    """
+    with transaction.atomic():
+        enrollment = (
+            Enrollment.objects.select_for_update()
+            .filter(student=student, course=course)
+            .exclude(status="dropped")
+            .first()
+        )
+        if enrollment is None:
+            return None
+
+        course_lessons = set(
+            Lesson.objects.filter(course=course).values_list("id", flat=True)
+        )
+        completed = (
+            set(enrollment.completed_lessons) | set(lesson_ids)
+        ) & course_lessons
+        enrollment.completed_lessons = sorted(completed)
+        if course_lessons and completed == course_lessons:
+            enrollment.status = "completed"
+        enrollment.save(update_fields=["completed_lessons", "status"])
+        return enrollment
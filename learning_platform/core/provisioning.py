@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Course, Enrollment, ProvisioningJob, User
+
+
+def find_existing(rows):
+    """Return the emails and usernames among `rows` that already exist (one query)."""
+    emails = [row["email"] for row in rows]
+    usernames = [row["username"] for row in rows]
+    existing = User.objects.filter(
+        Q(email__in=emails) | Q(username__in=usernames)
+    ).values_list("email", "username")
+    existing_emails, existing_usernames = set(), set()
+    for email, username in existing:
+        existing_emails.add(email)
+        existing_usernames.add(username)
+    return existing_emails, existing_usernames
+
+
+def provision_chunk(rows, courses):
+    # Rows that exist already (validated earlier, or created by an interrupted run
+    # of this job) are skipped, which is what makes re-running a chunk safe
+    existing_emails, existing_usernames = find_existing(rows)
+    users = [
+        User(
+            email=row["email"],
+            username=row["username"],
+            role=row["role"],
+            bio=row.get("bio", ""),
+            # Unusable password: users set their own through the invite link,
+            # so nothing is hashed here
+            password=make_password(None),
+        )
+        for row in rows
+        if row["email"] not in existing_emails
+        and row["username"] not in existing_usernames
+    ]
+    User.objects.bulk_create(users)
+    Enrollment.objects.bulk_create(
+        [
+            Enrollment(student=user, course=course)
+            for user in users
+            if user.role == "student"
+            for course in courses
+        ],
+        ignore_conflicts=True,
+    )
+    return users
+
+
+def stalled_before():
+    # A live run bumps updated_at with every chunk it commits
+    return timezone.now() - timedelta(seconds=settings.BULK_PROVISION_STALL_TIMEOUT)
+
+
+def claim_job(job_id):
+    """Atomically mark a pending (or stalled running) job as running; False if not."""
+    return bool(
+        ProvisioningJob.objects.filter(pk=job_id)
+        .filter(
+            Q(status="pending") | Q(status="running", updated_at__lt=stalled_before())
+        )
+        .update(status="running", updated_at=timezone.now())
+    )
+
+
+def run_job(job_id, on_chunk=None):
+    if not claim_job(job_id):
+        # Completed, or another worker is on it (e.g. a duplicate delivery)
+        return ProvisioningJob.objects.defer("rows").get(pk=job_id)
+
+    job = ProvisioningJob.objects.get(pk=job_id)
+    all_rows = job.rows
+    courses = list(Course.objects.filter(pk__in=job.course_ids))
+    chunk_size = settings.BULK_PROVISION_CHUNK
+    while True:
+        with transaction.atomic():
+            # Each chunk runs under the job row lock and starts from the locked
+            # row's cursor, so if a stalled run wakes up after being re-claimed the
+            # two can't process the same rows or overwrite each other's counters
+            job = (
+                ProvisioningJob.objects.select_for_update().defer("rows").get(pk=job_id)
+            )
+            if job.status != "running" or job.processed >= job.total:
+                break
+            rows = all_rows[job.processed : job.processed + chunk_size]
+            users = provision_chunk(rows, courses)
+            job.processed += len(rows)
+            job.created += len(users)
+            job.skipped += len(rows) - len(users)
+            job.save(update_fields=["processed", "created", "skipped", "updated_at"])
+            if on_chunk and users:
+                user_ids = [user.pk for user in users]
+                transaction.on_commit(lambda user_ids=user_ids: on_chunk(user_ids))
+
+    if job.status == "running":
+        job.status = "completed"
+        job.save(update_fields=["status", "updated_at"])
+    return job
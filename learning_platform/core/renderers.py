@@ -0,0 +1,43 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # optional speedup, fall back to the stdlib json encoder
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed.
+
+    For payloads of strings, ints, bools, decimals and datetimes the output is
+    byte-identical to JSONRenderer's compact form: non-native types still go
+    through DRF's JSONEncoder and U+2028/U+2029 are escaped the same way. Floats
+    are not: orjson writes 1e16 as 1e16 (json: 1e+16) and NaN/Infinity as null
+    instead of raising under STRICT_JSON. Only use it on views whose payloads
+    hold no floats (CourseViewSet list/search). Ints beyond 64 bits and indented
+    (browsable/`; indent=`) requests use the stdlib path.
+    """
+
+    _encoder = encoders.JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self._encoder.default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Course, Enrollment, Seat
+
+
+class SeatUnavailable(Exception):
+    pass
+
+
+def sync_seats(course):
+    """
+    Size the seat pool of a limited-capacity course to its capacity.
+
+    Students enrolled without a seat row (e.g. before the course had a capacity)
+    count against it. Shrinking only removes seats nobody holds; seats held above
+    the limit are trimmed when their holds lapse (see release_expired_seats).
+    """
+    with transaction.atomic():
+        # Concurrent syncs of one course (two saves) are serialized on its row
+        Course.objects.select_for_update().filter(pk=course.pk).first()
+        seated = Seat.objects.filter(course=course, holder__isnull=False).values(
+            "holder_id"
+        )
+        unseated = (
+            Enrollment.objects.filter(course=course)
+            .exclude(status="dropped")
+            .exclude(student_id__in=seated)
+            .count()
+        )
+        target = max(course.capacity - unseated, 0)
+        current = Seat.objects.filter(course=course).count()
+        if current < target:
+            Seat.objects.bulk_create(
+                [Seat(course=course) for _ in range(target - current)]
+            )
+        elif current > target:
+            surplus = Seat.objects.filter(
+                course=course, status="available"
+            ).values_list("pk", flat=True)[: current - target]
+            # status is re-checked by the DELETE itself: a seat claimed by a
+            # concurrent reservation since the SELECT is left alone
+            Seat.objects.filter(pk__in=list(surplus), status="available").delete()
+
+
+def reserve_seat(course, user):
+    """Hold a seat for `user` for SEAT_RESERVATION_TTL seconds (idempotent per user)."""
+    now = timezone.now()
+    reserved_until = now + timedelta(seconds=settings.SEAT_RESERVATION_TTL)
+
+    # Re-reserving (e.g. retrying checkout) extends the hold, never takes a 2nd seat.
+    # The extension is conditional: if the hold lapsed and the seat was re-claimed
+    # in the meantime, this user no longer holds it and falls through to the pool.
+    held = Seat.objects.filter(course=course, holder=user).first()
+    if held is not None:
+        if held.status == "taken":
+            return held
+        extended = Seat.objects.filter(
+            pk=held.pk, holder=user, status="reserved"
+        ).update(reserved_until=reserved_until)
+        if extended:
+            held.reserved_until = reserved_until
+            return held
+
+    try:
+        with transaction.atomic():
+            seat = (
+                Seat.objects.select_for_update(skip_locked=True)
+                .filter(course=course)
+                .filter(
+                    Q(status="available") | Q(status="reserved", reserved_until__lt=now)
+                )
+                .order_by("pk")
+                .first()
+            )
+            if seat is None:
+                raise SeatUnavailable("No seats left in this course.")
+            seat.holder = user
+            seat.status = "reserved"
+            seat.reserved_until = reserved_until
+            seat.save(update_fields=["holder", "status", "reserved_until"])
+            return seat
+    except IntegrityError:
+        # A concurrent request from the same user won the race (one_seat_per_holder)
+        return Seat.objects.get(course=course, holder=user)
+
+
+def take_seat(course, user):
+    """Turn the user's reservation (or a fresh one) into a permanently taken seat."""
+    seat = reserve_seat(course, user)
+    taken = Seat.objects.filter(pk=seat.pk, holder=user).update(
+        status="taken", reserved_until=None
+    )
+    if not taken:
+        raise SeatUnavailable("Seat reservation expired.")
+    return seat
+
+
+def release_expired_seats():
+    now = timezone.now()
+    expired = Seat.objects.filter(status="reserved", reserved_until__lt=now)
+    course_ids = set(expired.values_list("course_id", flat=True))
+    released = expired.update(status="available", holder=None, reserved_until=None)
+    # Capacity may have been lowered while these seats were held
+    for course in Course.objects.filter(pk__in=course_ids, capacity__isnull=False):
+        sync_seats(course)
+    return released
@@ -1,5 +1,22 @@
+from decimal import Decimal
+from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils import timezone
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode
 from rest_framework import serializers
-from .models import User, Course, Enrollment, Payment, Review
+from .models import (
+    User,
+    Course,
+    Enrollment,
+    Payment,
+    Review,
+    Section,
+    Lesson,
+    ActivityEvent,
+    ProvisioningJob,
+)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -19,11 +36,130 @@ class CourseSerializer(serializers.ModelSerializer):
             "description",
             "instructor",
             "price",
+            "capacity",
             "created_at",
             "updated_at",
         ]
 
 
+class CourseRowSerializer:
+    """
+    Read-only fast path producing exactly CourseSerializer's output from values()
+    rows (instructor fields come through the join), skipping per-field DRF
+    machinery. Used by list/search; keep in sync with CourseSerializer.
+    """
+
+    instructor_fields = UserSerializer.Meta.fields
+    course_fields = [
+        "id",
+        "title",
+        "description",
+        "price",
+        "capacity",
+        "created_at",
+        "updated_at",
+    ]
+    fields = course_fields + [f"instructor__{field}" for field in instructor_fields]
+    price_exponent = Decimal(1).scaleb(-Course._meta.get_field("price").decimal_places)
+
+    def __init__(self, rows):
+        self.rows = rows
+        # Resolve the active timezone once; it is a context-local lookup per call
+        self.timezone = timezone.get_current_timezone()
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.values(*cls.fields)
+
+    @property
+    def data(self):
+        return [self.to_representation(row) for row in self.rows]
+
+    def to_representation(self, row):
+        return {
+            "id": row["id"],
+            "title": row["title"],
+            "description": row["description"],
+            "instructor": {
+                field: row[f"instructor__{field}"] for field in self.instructor_fields
+            },
+            "price": "{:f}".format(row["price"].quantize(self.price_exponent)),
+            "capacity": row["capacity"],
+            "created_at": self.format_datetime(row["created_at"]),
+            "updated_at": self.format_datetime(row["updated_at"]),
+        }
+
+    def format_datetime(self, value):
+        # Same as serializers.DateTimeField with the default ISO 8601 format
+        value = value.astimezone(self.timezone).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+
+class CourseBulkActiveSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000
+    )
+    is_active = serializers.BooleanField()
+
+
+class SectionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Section
+        fields = ["id", "course", "title", "order"]
+
+    def validate_course(self, value):
+        # Lessons carry a denormalized course_id; moving the section would leave
+        # them pointing at the old course
+        if self.instance is not None and value.pk != self.instance.course_id:
+            raise serializers.ValidationError(
+                "A section can't be moved to another course."
+            )
+        return value
+
+
+class LessonSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Lesson
+        fields = ["id", "section", "course", "title", "body", "order"]
+        read_only_fields = ["course"]
+
+    def validate(self, data):
+        # Keep the denormalized course in step with the section
+        if "section" in data:
+            data["course"] = data["section"].course
+        return data
+
+
+class LessonOutlineSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Lesson
+        fields = ["id", "section", "course", "title", "order"]
+
+
+class LessonProgressSerializer(serializers.Serializer):
+    lessons = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000
+    )
+
+
+class ActivityEventSerializer(serializers.Serializer):
+    # api_request events are recorded server-side (core.middleware) only
+    type = serializers.ChoiceField(choices=["lesson_view", "watch_time"])
+    # Bounds match the ActivityEvent columns (bigint ids, integer value): a row
+    # Postgres would reject must not get into the stream
+    course = serializers.IntegerField(min_value=1, max_value=2**63 - 1)
+    lesson = serializers.IntegerField(
+        min_value=1, max_value=2**63 - 1, required=False, allow_null=True
+    )
+    value = serializers.IntegerField(min_value=0, max_value=2**31 - 1, default=0)
+
+
+class ActivityBatchSerializer(serializers.Serializer):
+    events = ActivityEventSerializer(many=True, allow_empty=False, max_length=500)
+
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=6)
 
@@ -38,15 +174,100 @@ class RegisterSerializer(serializers.ModelSerializer):
         return value
 
     def create(self, validated_data):
-        user = User.objects.create(
+        # create_user hashes first, so this is a single INSERT
+        return User.objects.create_user(
             email=validated_data["email"],
             username=validated_data["username"],
+            password=validated_data["password"],
             role=validated_data["role"],
-            bio=validated_data("bio", ""),
+            bio=validated_data.get("bio", ""),
         )
-        user.set_password(validated_data["password"])
-        user.save()
-        return user
+
+
+class BulkUserSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    # bulk_create skips model validation, so apply User.username's validators
+    # (charset and max length) here, as RegisterSerializer's ModelSerializer does
+    username = serializers.CharField(
+        validators=User._meta.get_field("username").validators
+    )
+    role = serializers.ChoiceField(choices=["student", "instructor"], default="student")
+    bio = serializers.CharField(required=False, allow_blank=True, default="")
+
+    def validate_email(self, value):
+        return User.objects.normalize_email(value)
+
+
+class BulkProvisionSerializer(serializers.Serializer):
+    users = BulkUserSerializer(many=True, allow_empty=False, max_length=50000)
+    course_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, default=list
+    )
+
+    def validate_users(self, users):
+        errors = {}
+        seen_emails, seen_usernames = set(), set()
+        for index, row in enumerate(users):
+            if row["email"] in seen_emails:
+                errors[index] = "Duplicate email in upload."
+            elif row["username"] in seen_usernames:
+                errors[index] = "Duplicate username in upload."
+            seen_emails.add(row["email"])
+            seen_usernames.add(row["username"])
+        if errors:
+            raise serializers.ValidationError(errors)
+        return users
+
+    def validate_course_ids(self, course_ids):
+        # Limited-capacity courses must go through seat reservations
+        found = set(
+            Course.objects.filter(
+                pk__in=course_ids, is_active=True, capacity__isnull=True
+            ).values_list("id", flat=True)
+        )
+        missing = set(course_ids) - found
+        if missing:
+            raise serializers.ValidationError(
+                f"Unknown, inactive or limited-capacity courses: {sorted(missing)}"
+            )
+        return course_ids
+
+
+class ProvisioningJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProvisioningJob
+        fields = [
+            "id",
+            "status",
+            "course_ids",
+            "total",
+            "processed",
+            "created",
+            "skipped",
+            "error",
+            "created_at",
+            "updated_at",
+        ]
+
+
+class SetPasswordSerializer(serializers.Serializer):
+    uid = serializers.CharField()
+    token = serializers.CharField()
+    password = serializers.CharField(write_only=True, min_length=6)
+
+    def validate(self, data):
+        try:
+            user = User.objects.get(pk=force_str(urlsafe_base64_decode(data["uid"])))
+        except (User.DoesNotExist, ValueError, TypeError, OverflowError):
+            user = None
+        if user is None or not default_token_generator.check_token(user, data["token"]):
+            raise serializers.ValidationError("Invalid or expired link.")
+        try:
+            validate_password(data["password"], user)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({"password": list(e.messages)})
+        data["user"] = user
+        return data
 
 
 class EnrollmentSerializer(serializers.ModelSerializer):
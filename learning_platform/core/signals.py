@@ -1,9 +1,49 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.core.cache import cache
-from .models import Course
+from .models import Course, User
+from .caching import (
+    bump_course_generation,
+    course_detail_cache,
+    touch_instructor_profiles,
+)
+from .seats import sync_seats
+
+
+# Fields of User that CourseSerializer embeds for the instructor
+INSTRUCTOR_DETAIL_FIELDS = {"email", "username", "role", "bio"}
+
+
+def invalidate_course_detail(*course_ids):
+    # After commit, so a concurrent read can't re-cache the pre-write row
+    if course_ids:
+        transaction.on_commit(lambda: course_detail_cache.invalidate(*course_ids))
 
 
 @receiver(post_save, sender=Course)
 def invalidate_course_cache(sender, instance, **kwargs):
-    cache.delete("course_list_cache")
+    bump_course_generation()  # invalidates autocomplete prefixes in every process
+    invalidate_course_detail(instance.pk)
+    if instance.capacity is not None:
+        sync_seats(instance)
+
+
+@receiver(post_delete, sender=Course)
+def invalidate_course_cache_on_delete(sender, instance, **kwargs):
+    bump_course_generation()
+    invalidate_course_detail(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def invalidate_instructor_courses(sender, instance, created, update_fields, **kwargs):
+    if created:
+        return
+    if update_fields is not None and not INSTRUCTOR_DETAIL_FIELDS & set(update_fields):
+        return  # e.g. last_login on every login
+    course_ids = list(
+        Course.objects.filter(instructor=instance).values_list("pk", flat=True)
+    )
+    if course_ids:
+        # Course payloads embed the instructor: move the list/detail validators on
+        transaction.on_commit(touch_instructor_profiles)
+        invalidate_course_detail(*course_ids)
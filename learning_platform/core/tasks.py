@@ -1,5 +1,11 @@
 from celery import shared_task
-from django.core.mail import send_mail
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import send_mail, send_mass_mail
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from . import events, provisioning, seats
+from .models import ProvisioningJob, User
 
 
 @shared_task
@@ -11,3 +17,49 @@ def send_payment_confirmation_email(user_email, course_title):
         recipient_list=[user_email],
         fail_silently=False,
     )
+
+
+@shared_task
+def release_expired_seats():
+    # Periodic (CELERY_BEAT_SCHEDULE): return lapsed checkout holds to the pool
+    return seats.release_expired_seats()
+
+
+@shared_task
+def drain_activity_events():
+    # Periodic: move buffered activity events from the Redis stream into Postgres
+    return events.drain_events()
+
+
+@shared_task
+def ensure_activity_partitions():
+    return events.ensure_partitions()
+
+
+@shared_task(acks_late=True)
+def provision_users(job_id):
+    # Resumable: a redelivered or re-queued job continues from job.processed
+    try:
+        job = provisioning.run_job(job_id, on_chunk=send_invite_emails.delay)
+    except Exception as e:
+        ProvisioningJob.objects.filter(pk=job_id).update(status="failed", error=str(e))
+        raise
+    return {"processed": job.processed, "created": job.created, "skipped": job.skipped}
+
+
+@shared_task
+def send_invite_emails(user_ids):
+    messages = []
+    for user in User.objects.filter(pk__in=user_ids):
+        uid = urlsafe_base64_encode(force_bytes(user.pk))
+        token = default_token_generator.make_token(user)
+        messages.append(
+            (
+                "You're invited to the Learning Platform",
+                f"Set your password to get started: "
+                f"{settings.PASSWORD_SETUP_URL}?uid={uid}&token={token}",
+                "no-reply@learningplatform.com",
+                [user.email],
+            )
+        )
+    send_mass_mail(messages, fail_silently=False)  # one SMTP connection per chunk
@@ -1,3 +1,874 @@
-from django.test import TestCase
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import fakeredis
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.db import DataError, connection
+from django.db.models import QuerySet
+from django.test import (
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+    skipUnlessDBFeature,
+)
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from django_redis import get_redis_connection
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from . import autocomplete
+from .caching import TwoLevelCache, bump_course_generation
+from .events import ACTIVITY_DEAD_LETTER, drain_events, record_events
+from .progress import record_progress
+from .provisioning import run_job
+from .models import (
+    ActivityEvent,
+    Course,
+    Enrollment,
+    Lesson,
+    Payment,
+    ProvisioningJob,
+    Seat,
+    Section,
+    User,
+)
+from .renderers import FastJSONRenderer
+from .serializers import (
+    ActivityEventSerializer,
+    CourseRowSerializer,
+    CourseSerializer,
+)
+from .seats import SeatUnavailable, release_expired_seats, reserve_seat, take_seat
+from .throttling import RoleRateThrottle
+
+
+def make_user(name, role):
+    return User.objects.create(email=f"{name}@example.com", username=name, role=role)
+
+
+def make_course(instructor, **kwargs):
+    return Course.objects.create(
+        title=kwargs.pop("title", "Course"),
+        description="Test course",
+        instructor=instructor,
+        price=Decimal("10.00"),
+        **kwargs,
+    )
+
+
+@skipUnlessDBFeature("has_select_for_update_skip_locked")
+class SeatContentionTests(TransactionTestCase):
+    """Parallel claims against a limited-capacity course (needs PostgreSQL)."""
+
+    capacity = 10
+    buyers = 100
+    workers = 25
+
+    def setUp(self):
+        self.course = make_course(
+            make_user("teacher", "instructor"), capacity=self.capacity
+        )
+        self.students = User.objects.bulk_create(
+            [
+                User(
+                    email=f"buyer{i}@example.com",
+                    username=f"buyer{i}",
+                    role="student",
+                )
+                for i in range(self.buyers)
+            ]
+        )
+
+    def claim_in_parallel(self, claim, students):
+        def attempt(student):
+            try:
+                claim(self.course, student)
+                return True
+            except SeatUnavailable:
+                return False
+            finally:
+                connection.close()  # each worker thread has its own connection
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(attempt, students))
+
+    def assertOneSeatPerHolder(self, status):
+        seats = Seat.objects.filter(course=self.course, status=status)
+        holders = seats.values("holder").distinct().count()
+        self.assertEqual(holders, seats.count())
+        return seats.count()
+
+    def test_parallel_take_seat_never_oversells(self):
+        results = self.claim_in_parallel(take_seat, self.students)
+
+        self.assertEqual(sum(results), self.capacity)
+        self.assertEqual(self.assertOneSeatPerHolder("taken"), self.capacity)
+
+    def test_parallel_reserve_seat_never_oversells(self):
+        results = self.claim_in_parallel(reserve_seat, self.students)
+
+        self.assertEqual(sum(results), self.capacity)
+        self.assertEqual(self.assertOneSeatPerHolder("reserved"), self.capacity)
+
+    def test_double_submit_takes_one_seat(self):
+        student = self.students[0]
+        results = self.claim_in_parallel(take_seat, [student] * self.workers)
+
+        self.assertTrue(all(results))
+        self.assertEqual(
+            Seat.objects.filter(course=self.course, holder=student).count(), 1
+        )
+
+
+class LapsedHoldTests(APITestCase):
+    def setUp(self):
+        self.course = make_course(make_user("teacher", "instructor"), capacity=1)
+        self.first = make_user("first", "student")
+        self.second = make_user("second", "student")
+
+    def expire_hold(self, user):
+        Seat.objects.filter(course=self.course, holder=user).update(
+            reserved_until=timezone.now() - timedelta(seconds=1)
+        )
+
+    def test_lapsed_hold_lost_to_another_buyer(self):
+        reserve_seat(self.course, self.first)
+        self.expire_hold(self.first)
+        seat = reserve_seat(self.course, self.second)
+
+        with self.assertRaises(SeatUnavailable):
+            reserve_seat(self.course, self.first)
+        seat.refresh_from_db()
+        self.assertEqual(seat.holder, self.second)
+        self.assertGreater(seat.reserved_until, timezone.now())
+
+    def test_lapsed_hold_not_yet_reclaimed_is_extended(self):
+        seat = reserve_seat(self.course, self.first)
+        self.expire_hold(self.first)
+
+        self.assertEqual(reserve_seat(self.course, self.first).pk, seat.pk)
+        seat.refresh_from_db()
+        self.assertGreater(seat.reserved_until, timezone.now())
+
+    @mock.patch("core.views.send_payment_confirmation_email")
+    @mock.patch("core.views.get_stripe")
+    def test_payment_refunded_when_hold_lapses_mid_checkout(self, get_stripe, _):
+        stripe = get_stripe.return_value
+        stripe.error.StripeError = type("StripeError", (Exception,), {})
+
+        def charge_while_seat_is_resold(**kwargs):
+            # The hold lapses during the charge and another buyer takes the seat
+            Seat.objects.filter(course=self.course).update(
+                holder=self.second, status="taken", reserved_until=None
+            )
+            return mock.Mock(id="ch_resold")
+
+        stripe.Charge.create.side_effect = charge_while_seat_is_resold
+        self.client.force_authenticate(self.first)
+
+        response = self.client.post(
+            "/api/pay/", {"course_id": self.course.id, "stripe_token": "tok"}
+        )
+
+        self.assertEqual(response.status_code, 409)
+        stripe.Refund.create.assert_called_once_with(charge="ch_resold")
+        self.assertFalse(
+            Enrollment.objects.filter(student=self.first, course=self.course).exists()
+        )
+        payment = Payment.objects.get(user=self.first, course=self.course)
+        self.assertEqual(payment.status, "failed")
+
+
+class SeatPoolTests(APITestCase):
+    def setUp(self):
+        self.course = make_course(make_user("teacher", "instructor"))
+        self.students = [make_user(f"student{i}", "student") for i in range(3)]
+
+    def set_capacity(self, capacity):
+        self.course.capacity = capacity
+        self.course.save()
+
+    def test_existing_enrollments_count_against_new_capacity(self):
+        for student in self.students[:2]:
+            Enrollment.objects.create(student=student, course=self.course)
+        Enrollment.objects.create(
+            student=self.students[2], course=self.course, status="dropped"
+        )
+
+        self.set_capacity(5)
+
+        self.assertEqual(Seat.objects.filter(course=self.course).count(), 3)
+
+    def test_shrinking_keeps_held_seats_until_they_lapse(self):
+        self.set_capacity(3)
+        reserve_seat(self.course, self.students[0])
+        reserve_seat(self.course, self.students[1])
+
+        self.set_capacity(1)
+
+        seats = Seat.objects.filter(course=self.course)
+        self.assertEqual(seats.count(), 2)
+        self.assertFalse(seats.filter(status="available").exists())
+
+        seats.update(reserved_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(release_expired_seats(), 2)
+        self.assertEqual(seats.count(), 1)
+
+    def test_shrinking_leaves_seat_reserved_after_the_select(self):
+        self.set_capacity(2)
+        delete = QuerySet.delete
+
+        def reserved_meanwhile(queryset):
+            # Both seats were read as available; one is reserved before the DELETE
+            reserve_seat(self.course, self.students[0])
+            return delete(queryset)
+
+        with mock.patch.object(QuerySet, "delete", reserved_meanwhile):
+            self.set_capacity(0)
+
+        seat = Seat.objects.get(course=self.course)
+        self.assertEqual(seat.holder, self.students[0])
+
+
+class CourseOwnershipTests(APITestCase):
+    def setUp(self):
+        self.owner = make_user("owner", "instructor")
+        self.other = make_user("other", "instructor")
+        self.admin = make_user("admin", "admin")
+        self.course = make_course(self.owner, title="Owned")
+        self.section = Section.objects.create(course=self.course, title="Intro")
+        self.lesson = Lesson.objects.create(
+            section=self.section, course=self.course, title="Welcome"
+        )
+
+    def as_user(self, user):
+        self.client.force_authenticate(user)
+        return self.client
+
+    def test_non_owner_instructor_cannot_update_or_delete(self):
+        url = f"/api/courses/{self.course.id}/"
+        client = self.as_user(self.other)
+
+        self.assertEqual(client.patch(url, {"title": "Taken"}).status_code, 404)
+        self.assertEqual(client.delete(url).status_code, 404)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.title, "Owned")
+
+    def test_owner_and_admin_can_update(self):
+        url = f"/api/courses/{self.course.id}/"
+
+        response = self.as_user(self.owner).patch(url, {"title": "By owner"})
+        self.assertEqual(response.status_code, 200)
+        response = self.as_user(self.admin).patch(url, {"title": "By admin"})
+        self.assertEqual(response.status_code, 200)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.title, "By admin")
+
+    def test_admin_can_delete(self):
+        response = self.as_user(self.admin).delete(f"/api/courses/{self.course.id}/")
+
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Course.objects.filter(pk=self.course.pk).exists())
+
+    def test_bulk_active_denies_courses_the_caller_does_not_own(self):
+        mine = make_course(self.other, title="Mine")
+
+        response = self.as_user(self.other).post(
+            "/api/courses/bulk-active/",
+            {"ids": [mine.id, self.course.id], "is_active": False},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data["ids"], [self.course.id])
+        self.assertTrue(Course.objects.get(pk=mine.pk).is_active)  # all or nothing
+
+    def test_bulk_active_updates_own_courses(self):
+        response = self.as_user(self.owner).post(
+            "/api/courses/bulk-active/",
+            {"ids": [self.course.id], "is_active": False},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated"], 1)
+        self.assertFalse(Course.objects.get(pk=self.course.pk).is_active)
+
+    def test_content_writes_on_another_instructors_course(self):
+        client = self.as_user(self.other)
+
+        response = client.post(
+            "/api/sections/", {"course": self.course.id, "title": "Hijack"}
+        )
+        self.assertEqual(response.status_code, 403)
+        response = client.post(
+            "/api/lessons/", {"section": self.section.id, "title": "Hijack"}
+        )
+        self.assertEqual(response.status_code, 403)
+        response = client.patch(f"/api/lessons/{self.lesson.id}/", {"title": "X"})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Section.objects.filter(course=self.course).count(), 1)
+
+    def test_owner_can_write_content(self):
+        response = self.as_user(self.owner).post(
+            "/api/lessons/", {"section": self.section.id, "title": "Next"}
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["course"], self.course.id)
+
+
+class ActivityEventIngestTests(APITestCase):
+    def setUp(self):
+        self.student = make_user("learner", "student")
+        self.course = make_course(make_user("teacher", "instructor"))
+        self.other_course = make_course(self.course.instructor, title="Other")
+        section = Section.objects.create(course=self.course, title="Intro")
+        self.lesson = Lesson.objects.create(
+            section=section, course=self.course, title="Welcome"
+        )
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.client.force_authenticate(self.student)
+
+    def post_events(self, *events):
+        return self.client.post("/api/events/", {"events": events}, format="json")
+
+    @mock.patch("core.views.record_events", side_effect=len)
+    def test_events_for_enrolled_course_are_accepted(self, record):
+        response = self.post_events(
+            {"type": "lesson_view", "course": self.course.id, "lesson": self.lesson.id},
+            {"type": "watch_time", "course": self.course.id, "value": 60},
+        )
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data, {"accepted": 2, "dropped": 0})
+        self.assertEqual(record.call_args.args[0][0]["user"], self.student.id)
+
+    @mock.patch("core.views.record_events")
+    def test_events_for_other_courses_are_rejected(self, record):
+        response = self.post_events(
+            {"type": "watch_time", "course": self.course.id, "value": 60},
+            {"type": "watch_time", "course": self.other_course.id, "value": 60},
+        )
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data["ids"], [self.other_course.id])
+        record.assert_not_called()
+
+    @mock.patch("core.views.record_events")
+    def test_lesson_must_belong_to_the_course(self, record):
+        Enrollment.objects.create(student=self.student, course=self.other_course)
+
+        response = self.post_events(
+            {
+                "type": "lesson_view",
+                "course": self.other_course.id,
+                "lesson": self.lesson.id,
+            }
+        )
+
+        self.assertEqual(response.status_code, 400)
+        record.assert_not_called()
+
+    def test_api_request_events_are_server_side_only(self):
+        response = self.post_events({"type": "api_request", "course": self.course.id})
+
+        self.assertEqual(response.status_code, 400)
+
+    @mock.patch("core.middleware.record_event")
+    def test_course_requests_are_recorded_as_api_activity(self, record):
+        self.client.get(f"/api/courses/{self.course.id}/")
+        self.client.get("/api/courses/")
+
+        record.assert_called_once_with(
+            "api_request", self.student.id, self.course.id, value=mock.ANY
+        )
+
+    def test_values_outside_the_column_types_are_rejected(self):
+        for event in [
+            {"type": "watch_time", "course": 1, "value": 2**31},
+            {"type": "watch_time", "course": 2**63},
+            {"type": "lesson_view", "course": 1, "lesson": 2**63},
+        ]:
+            serializer = ActivityEventSerializer(data=event)
+            self.assertFalse(serializer.is_valid(), event)
+
+    def test_drain_dead_letters_rows_postgres_rejects(self):
+        client = get_redis_connection("default")
+        drain_events()  # start from an empty stream
+        dead_before = client.xlen(ACTIVITY_DEAD_LETTER)
+        record_events(
+            [
+                {"type": "watch_time", "user": 1, "course": 1, "value": 30},
+                {"type": "watch_time", "user": 1, "course": 1, "value": 2**31},
+            ]
+        )
+        bulk_create = ActivityEvent.objects.bulk_create
+
+        def int4_bulk_create(events, *args, **kwargs):
+            if any(event.value > 2**31 - 1 for event in events):
+                raise DataError("integer out of range")
+            return bulk_create(events, *args, **kwargs)
+
+        with mock.patch.object(
+            ActivityEvent.objects, "bulk_create", side_effect=int4_bulk_create
+        ):
+            self.assertEqual(drain_events(), 2)
+
+        self.assertEqual(ActivityEvent.objects.filter(value=30).count(), 1)
+        self.assertEqual(client.xlen(ACTIVITY_DEAD_LETTER), dead_before + 1)
+        self.assertEqual(drain_events(), 0)  # nothing left pending
+
+
+class CourseConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.instructor = make_user("teacher", "instructor")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course = make_course(self.instructor, title="Original")
+        self.detail_url = f"/api/courses/{self.course.id}/"
+        self.client.force_authenticate(make_user("learner", "student"))
+
+    def revalidate(self, url):
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        return etag
+
+    def write(self, instance, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            for field, value in fields.items():
+                setattr(instance, field, value)
+            instance.save()
+
+    def test_list_and_detail_revalidate_until_a_course_write(self):
+        list_etag = self.revalidate("/api/courses/")
+        detail_etag = self.revalidate(self.detail_url)
+
+        self.write(self.course, title="Renamed")
+
+        response = self.client.get("/api/courses/", HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["title"], "Renamed")
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["title"], "Renamed")
+
+    def test_instructor_profile_change_invalidates_validators(self):
+        list_etag = self.revalidate("/api/courses/")
+        detail_etag = self.revalidate(self.detail_url)
+
+        self.write(self.instructor, bio="Now teaching full time")
+
+        response = self.client.get("/api/courses/", HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["instructor"]["bio"], "Now teaching full time")
+
+    def test_missing_course_is_404(self):
+        self.assertEqual(self.client.get("/api/courses/999999/").status_code, 404)
+        self.assertEqual(self.client.get("/api/courses/abc/").status_code, 404)
+
+
+class CourseContentTests(APITestCase):
+    def setUp(self):
+        self.instructor = make_user("teacher", "instructor")
+        self.student = make_user("learner", "student")
+        self.course = make_course(self.instructor)
+        self.section = Section.objects.create(course=self.course, title="Intro")
+        self.lessons = [
+            Lesson.objects.create(
+                section=self.section,
+                course=self.course,
+                title=f"Lesson {i}",
+                body="Long lesson body",
+                order=i,
+            )
+            for i in range(3)
+        ]
+        self.enrollment = Enrollment.objects.create(
+            student=self.student, course=self.course
+        )
+
+    def test_progress_completes_the_enrollment_after_the_last_lesson(self):
+        first, *rest = [lesson.id for lesson in self.lessons]
+
+        enrollment = record_progress(self.student, self.course, [first, 999999])
+        self.assertEqual(enrollment.completed_lessons, [first])
+        self.assertEqual(enrollment.status, "active")
+
+        enrollment = record_progress(self.student, self.course, rest)
+        self.assertEqual(enrollment.completed_lessons, sorted([first, *rest]))
+        self.assertEqual(enrollment.status, "completed")
+
+    def test_progress_requires_an_enrollment(self):
+        outsider = make_user("outsider", "student")
+
+        self.assertIsNone(record_progress(outsider, self.course, [self.lessons[0].id]))
+
+    def test_outline_has_no_lesson_bodies(self):
+        record_progress(self.student, self.course, [self.lessons[0].id])
+        self.client.force_authenticate(self.student)
+
+        response = self.client.get(f"/api/courses/{self.course.id}/outline/")
+
+        self.assertEqual(response.status_code, 200)
+        (section,) = response.data["sections"]
+        self.assertEqual(len(section["lessons"]), 3)
+        self.assertTrue(all("body" not in lesson for lesson in section["lessons"]))
+        self.assertEqual(response.data["completed_lessons"], [self.lessons[0].id])
+
+    def test_lesson_list_is_an_outline(self):
+        self.client.force_authenticate(self.student)
+
+        response = self.client.get(f"/api/lessons/?course={self.course.id}")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 3)
+        self.assertNotIn("body", response.data[0])
+
+    def test_non_integer_filters_are_400(self):
+        self.client.force_authenticate(self.student)
+
+        for url in ["/api/sections/?course=abc", "/api/lessons/?section=1x"]:
+            self.assertEqual(self.client.get(url).status_code, 400, url)
+
+    def test_section_cannot_move_to_another_course(self):
+        other = make_course(self.instructor, title="Other")
+        self.client.force_authenticate(self.instructor)
+
+        response = self.client.patch(
+            f"/api/sections/{self.section.id}/", {"course": other.id}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.section.refresh_from_db()
+        self.assertEqual(self.section.course_id, self.course.id)
+
+
+class CourseRenderingTests(APITestCase):
+    def setUp(self):
+        self.instructor = make_user("teacher", "instructor")  # bio is None
+        make_course(self.instructor, title="Zürich\u2028line", capacity=5)
+        make_course(self.instructor, title="Second")
+        self.queryset = Course.objects.select_related("instructor").order_by("id")
+
+    def test_row_path_matches_serializer_bytes(self):
+        with timezone.override("America/New_York"):
+            expected = JSONRenderer().render(
+                CourseSerializer(self.queryset, many=True).data
+            )
+            rendered = FastJSONRenderer().render(
+                CourseRowSerializer(CourseRowSerializer.values(self.queryset)).data
+            )
+
+        self.assertEqual(rendered, expected)
+        self.assertIn(b'"bio":null', rendered)
+        self.assertIn(b"-04:00", rendered)
+
+    def test_list_response_matches_serializer_bytes(self):
+        self.client.force_authenticate(make_user("student", "student"))
+
+        with timezone.override("Asia/Kolkata"):
+            response = self.client.get("/api/courses/", {"ordering": "id"})
+            expected = JSONRenderer().render(
+                CourseSerializer(self.queryset, many=True).data
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+        self.assertEqual(response.content, expected)
+
+    def test_oversized_int_falls_back_to_json(self):
+        data = {"big": 2**70}
+
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+@override_settings(
+    ROLE_THROTTLE_RATES={
+        "default": {
+            "anon": "2/min",
+            "student": "3/min",
+            "instructor": "4/min",
+            "admin": None,
+        },
+        "login": {"anon": "1/min"},
+    }
+)
+class RoleRateThrottleTests(APITestCase):
+    def setUp(self):
+        self.use_redis(fakeredis.FakeRedis())
+
+    def use_redis(self, client):
+        patcher = mock.patch(
+            "core.throttling.get_redis_connection", return_value=client
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        RoleRateThrottle._script = None  # registered against the patched client
+        self.addCleanup(setattr, RoleRateThrottle, "_script", None)
+
+    def statuses(self, user, count, url="/api/courses/", method="get", **extra):
+        self.client.force_authenticate(user)
+        request = getattr(self.client, method)
+        return [request(url, **extra).status_code for _ in range(count)]
+
+    def test_rate_depends_on_role(self):
+        student = make_user("student", "student")
+        instructor = make_user("teacher", "instructor")
+
+        self.assertEqual(self.statuses(student, 4), [200, 200, 200, 429])
+        self.assertEqual(self.statuses(instructor, 5), [200, 200, 200, 200, 429])
+
+    def test_role_missing_from_scope_uses_default_scope(self):
+        student = make_user("student", "student")
+
+        statuses = self.statuses(student, 4, "/api/login/", "post")
+
+        self.assertNotIn(429, statuses[:3])
+        self.assertEqual(statuses[3], 429)
+
+    def test_admin_is_unthrottled(self):
+        admin = make_user("admin", "admin")
+
+        self.assertNotIn(429, self.statuses(admin, 20))
+
+    def test_throttled_response_has_retry_after(self):
+        self.client.post("/api/login/")
+        response = self.client.post("/api/login/")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertIn(int(response["Retry-After"]), (59, 60))
+
+    def test_forwarded_for_does_not_change_anon_key(self):
+        statuses = [
+            self.client.post(
+                "/api/login/", HTTP_X_FORWARDED_FOR=f"203.0.113.{i}"
+            ).status_code
+            for i in range(3)
+        ]
+
+        self.assertEqual(statuses[1:], [429, 429])
+
+    def test_requests_pass_when_redis_is_down(self):
+        server = fakeredis.FakeServer()
+        server.connected = False
+        self.use_redis(fakeredis.FakeRedis(server=server))
+        student = make_user("student", "student")
+
+        self.assertEqual(self.statuses(student, 5), [200] * 5)
+
+
+class BulkProvisioningTests(APITestCase):
+    def setUp(self):
+        self.admin = make_user("admin", "admin")
+        self.course = make_course(make_user("teacher", "instructor"))
+        self.rows = [
+            {"email": f"new{i}@example.com", "username": f"new{i}", "role": "student"}
+            for i in range(5)
+        ]
+
+    @mock.patch("core.views.provision_users")
+    def test_existing_users_are_skipped(self, provision_users):
+        make_user("new0", "student")
+        self.client.force_authenticate(self.admin)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/admin/users/bulk/",
+                {"users": self.rows, "course_ids": [self.course.id]},
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.data["total"], response.data["skipped"]), (4, 1))
+        job = ProvisioningJob.objects.get(pk=response.data["id"])
+        self.assertNotIn("new0", [row["username"] for row in job.rows])
+        provision_users.delay.assert_called_once_with(job.id)
+
+    @override_settings(BULK_PROVISION_CHUNK=2)
+    def test_resumed_job_continues_from_processed(self):
+        # An earlier run committed the first chunk, then failed
+        for row in self.rows[:2]:
+            make_user(row["username"], "student")
+        job = ProvisioningJob.objects.create(
+            rows=self.rows,
+            course_ids=[self.course.id],
+            total=5,
+            processed=2,
+            created=2,
+            status="failed",
+        )
+        make_user("new3", "student")  # signed up while the job was down
+        self.client.force_authenticate(self.admin)
+
+        with mock.patch("core.views.provision_users") as provision_users:
+            response = self.client.post(f"/api/admin/users/bulk/{job.id}/")
+        self.assertEqual(response.status_code, 202)
+        provision_users.delay.assert_called_once_with(job.id)
+
+        on_chunk = mock.Mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            job = run_job(job.id, on_chunk=on_chunk)
+
+        self.assertEqual(job.status, "completed")
+        self.assertEqual((job.processed, job.created, job.skipped), (5, 4, 1))
+        new_users = User.objects.filter(username__in=["new2", "new4"])
+        self.assertEqual(new_users.count(), 2)
+        # Only users created by this run are enrolled and invited
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 2)
+        invited = [
+            user_id for call in on_chunk.call_args_list for user_id in call[0][0]
+        ]
+        self.assertCountEqual(invited, new_users.values_list("id", flat=True))
+
+
+class SetPasswordTests(APITestCase):
+    password = "correct-horse-battery-9"
+
+    def setUp(self):
+        self.user = make_user("invited", "student")
+        self.user.set_unusable_password()
+        self.user.save()
+        self.uid = urlsafe_base64_encode(force_bytes(self.user.pk))
+
+    def set_password(self, uid, token):
+        return self.client.post(
+            "/api/password/set/",
+            {"uid": uid, "token": token, "password": self.password},
+        )
+
+    def test_token_sets_password_once(self):
+        token = default_token_generator.make_token(self.user)
+
+        self.assertEqual(self.set_password(self.uid, token).status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password(self.password))
+        # The password hash is part of the token, so the link is now spent
+        self.assertEqual(self.set_password(self.uid, token).status_code, 400)
+
+    def test_invalid_links_are_rejected(self):
+        token = default_token_generator.make_token(self.user)
+        other_uid = urlsafe_base64_encode(force_bytes(make_user("other", "student").pk))
+
+        for uid, bad_token in [
+            (self.uid, "1-bad"),
+            ("not-base64!", token),
+            (other_uid, token),
+        ]:
+            self.assertEqual(self.set_password(uid, bad_token).status_code, 400)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.has_usable_password())
+
+
+@mock.patch.object(TwoLevelCache, "_ensure_subscriber", mock.Mock())
+class TwoLevelCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.name = f"test_cache_{uuid.uuid4().hex}"
+        self.cache = self.make_cache()
+
+    def make_cache(self):
+        # One instance per simulated process, sharing the L2 cache
+        return TwoLevelCache(self.name, l1_size=10, l1_ttl=60, l2_ttl=60)
+
+    def test_invalidate_reloads_in_every_process(self):
+        other = self.make_cache()
+        loader = mock.Mock(return_value="v1")
+        self.assertEqual(self.cache.get(1, loader), "v1")
+        self.assertEqual(other.get(1, loader), "v1")  # L2 hit
+        self.assertEqual(self.cache.get(1, loader), "v1")  # L1 hit
+        self.assertEqual(loader.call_count, 1)
+
+        self.cache.invalidate(1)
+        loader.return_value = "v2"
+        other.l1.clear()  # what its subscriber does on the broadcast
+
+        self.assertEqual(self.cache.get(1, loader), "v2")
+        self.assertEqual(other.get(1, loader), "v2")
+        self.assertEqual(loader.call_count, 2)
+        self.assertEqual(self.cache.stats()["misses"] + other.stats()["misses"], 2)
+
+    def test_late_fill_does_not_outlive_invalidation(self):
+        def load_then_lose_race():
+            # The write commits (and invalidates) while this reader is loading
+            self.make_cache().invalidate(1)
+            return "stale"
+
+        self.assertEqual(self.cache.get(1, load_then_lose_race), "stale")
+        self.cache._evict("1")  # this process's subscriber receiving the broadcast
+
+        self.assertEqual(self.cache.get(1, lambda: "fresh"), "fresh")
+
+    def test_late_fill_skips_l1_after_local_eviction(self):
+        def load_then_lose_race():
+            self.cache.invalidate(1)
+            return "stale"
+
+        self.cache.get(1, load_then_lose_race)
+
+        self.assertIsNone(self.cache.l1.get("1"))
+        self.assertEqual(self.cache.get(1, lambda: "fresh"), "fresh")
+
+
+class TwoLevelCacheBroadcastTests(SimpleTestCase):
+    def test_invalidation_evicts_other_processes_l1(self):
+        name = f"test_cache_{uuid.uuid4().hex}"
+        writer = TwoLevelCache(name, l1_size=10, l1_ttl=60, l2_ttl=60)
+        reader = TwoLevelCache(name, l1_size=10, l1_ttl=60, l2_ttl=60)
+        client = get_redis_connection("default")
+        reader.get(1, lambda: "v1")  # starts its subscriber
+        self.wait_for(lambda: client.pubsub_numsub(reader.channel)[0][1])
+        self.assertEqual(reader.get(1, lambda: "v1"), "v1")
+
+        writer.invalidate(1)
+
+        self.wait_for(lambda: reader.l1.get("1") is None)
+        self.assertEqual(reader.get(1, lambda: "v2"), "v2")
+
+    def wait_for(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "timed out")
+            time.sleep(0.01)
+
+
+@mock.patch("core.autocomplete._query_suggestions")
+class AutocompleteCacheTests(APITestCase):
+    def setUp(self):
+        autocomplete._prefix_cache.clear()
+
+    def test_prefix_is_served_from_cache(self, query):
+        query.return_value = [{"id": 1, "title": "Python"}]
+
+        self.assertEqual(autocomplete.suggest_courses("Py"), query.return_value)
+        self.assertEqual(autocomplete.suggest_courses("  py "), query.return_value)
+        query.assert_called_once_with("py", settings.COURSE_AUTOCOMPLETE_LIMIT)
+
+    def test_generation_bump_invalidates_cached_prefixes(self, query):
+        query.return_value = [{"id": 1, "title": "Python"}]
+        autocomplete.suggest_courses("py")
+
+        bump_course_generation()
+        query.return_value = []
+
+        self.assertEqual(autocomplete.suggest_courses("py"), [])
+        self.assertEqual(query.call_count, 2)
+
+    def test_course_write_invalidates_cached_prefixes(self, query):
+        course = make_course(make_user("teacher", "instructor"), title="Python")
+        query.return_value = [{"id": course.id, "title": "Python"}]
+        autocomplete.suggest_courses("py")
+
+        course.is_active = False
+        course.save()
+        query.return_value = []
+
+        self.assertEqual(autocomplete.suggest_courses("py"), [])
+        self.assertEqual(query.call_count, 2)
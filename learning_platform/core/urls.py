@@ -1,15 +1,42 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CourseViewSet, RegisterView, LoginView, PaymentView
+from .views import (
+    CourseViewSet,
+    SectionViewSet,
+    LessonViewSet,
+    DashboardView,
+    ActivityEventView,
+    ActivityMetricsView,
+    CacheStatsView,
+    BulkProvisionView,
+    ProvisioningJobView,
+    SetPasswordView,
+    RegisterView,
+    LoginView,
+    PaymentView,
+)
 
 
 router = DefaultRouter()
 router.register(r"courses", CourseViewSet, basename="courses")
+router.register(r"sections", SectionViewSet, basename="sections")
+router.register(r"lessons", LessonViewSet, basename="lessons")
 
 
 urlpatterns = [
     path("api/", include(router.urls)),
     path("api/register/", RegisterView.as_view(), name="register"),
     path("api/login/", LoginView.as_view(), name="login"),
+    path("api/password/set/", SetPasswordView.as_view(), name="set-password"),
+    path("api/admin/users/bulk/", BulkProvisionView.as_view(), name="bulk-provision"),
+    path(
+        "api/admin/users/bulk/<int:pk>/",
+        ProvisioningJobView.as_view(),
+        name="bulk-provision-job",
+    ),
     path("api/pay/", PaymentView.as_view(), name="pay"),
+    path("api/dashboard/", DashboardView.as_view(), name="dashboard"),
+    path("api/events/", ActivityEventView.as_view(), name="events"),
+    path("api/events/metrics/", ActivityMetricsView.as_view(), name="events-metrics"),
+    path("api/cache/stats/", CacheStatsView.as_view(), name="cache-stats"),
 ]
@@ -1,59 +1,372 @@
-import stripe
+import csv
+import hashlib
+import io
+import json
+from datetime import timedelta
 from django.contrib.auth import authenticate
 from django.contrib.postgres.search import SearchQuery, SearchRank
 from django.conf import settings
-from django.views.decorators.cache import cache_page
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import action
-from .models import Course, Payment, Enrollment
+from rest_framework.renderers import BrowsableAPIRenderer
+from .models import (
+    Course,
+    Payment,
+    Enrollment,
+    Section,
+    Lesson,
+    ActivityEvent,
+    ProvisioningJob,
+)
 from .serializers import (
     CourseSerializer,
+    CourseRowSerializer,
     RegisterSerializer,
     EnrollmentSerializer,
     PaymentSerializer,
+    SectionSerializer,
+    LessonSerializer,
+    LessonOutlineSerializer,
+    LessonProgressSerializer,
+    ActivityBatchSerializer,
+    CourseBulkActiveSerializer,
+    BulkProvisionSerializer,
+    ProvisioningJobSerializer,
+    SetPasswordSerializer,
+)
+from .renderers import FastJSONRenderer
+from .permissions import (
+    IsInstructor,
+    IsAdmin,
+    IsStudent,
+    CanViewLesson,
+    authorize_course_ids,
+    get_instructor_course_ids,
+)
+from .caching import (
+    bump_course_generation,
+    course_detail_cache,
+    get_instructor_profiles_changed_at,
 )
-from .permissions import IsInstructor, IsStudent
-from .tasks import send_payment_confirmation_email
+from .events import record_event, record_events, stream_metrics
+from .progress import record_progress
+from .autocomplete import suggest_courses
+from .seats import SeatUnavailable, reserve_seat, take_seat
+from .payments import get_stripe
+from .provisioning import find_existing, stalled_before
+from .tasks import send_payment_confirmation_email, provision_users
+
+
+# Conditional GET probes: one cheap query (no serialization) memoized on the request,
+# since condition() asks for the ETag and Last-Modified separately. Course payloads
+# embed the instructor, so the last instructor profile change counts as a
+# modification too.
+def _course_list_probe(request):
+    if not hasattr(request, "_course_probe"):
+        probe = Course.objects.aggregate(
+            count=Count("id"), last_modified=Max("updated_at")
+        )
+        probe["last_modified"] = max(
+            filter(None, [probe["last_modified"], get_instructor_profiles_changed_at()])
+        )
+        request._course_probe = probe
+    return request._course_probe
+
+
+def _load_course_detail(pk):
+    course = Course.objects.select_related("instructor").filter(pk=pk).first()
+    return dict(CourseSerializer(course).data) if course else None
+
+
+def get_course_detail(request, pk):
+    # L1/L2 cached payload, memoized on the request for the condition() probes
+    if not hasattr(request, "_course_detail"):
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            request._course_detail = None
+        else:
+            request._course_detail = course_detail_cache.get(
+                pk, lambda: _load_course_detail(pk)
+            )
+    return request._course_detail
+
+
+def _course_detail_probe(request, pk):
+    # Derived from the cached payload, so a warm detail request skips the database
+    if not hasattr(request, "_course_probe"):
+        data = get_course_detail(request, pk)
+        if data is None:
+            request._course_probe = None
+        else:
+            payload = json.dumps(data, sort_keys=True, default=str).encode()
+            request._course_probe = {
+                "etag": f'"course-{pk}-{hashlib.sha1(payload).hexdigest()[:16]}"',
+                "last_modified": max(
+                    parse_datetime(data["updated_at"]),
+                    get_instructor_profiles_changed_at(),
+                ),
+            }
+    return request._course_probe
+
+
+def course_list_etag(request, *args, **kwargs):
+    probe = _course_list_probe(request)
+    last_modified = probe["last_modified"]
+    stamp = last_modified.timestamp() if last_modified else 0
+    return f'"courses-{probe["count"]}-{stamp}"'
+
+
+def course_list_last_modified(request, *args, **kwargs):
+    return _course_list_probe(request)["last_modified"]
+
+
+def course_detail_etag(request, pk=None, *args, **kwargs):
+    probe = _course_detail_probe(request, pk)
+    return probe["etag"] if probe else None
+
+
+def course_detail_last_modified(request, pk=None, *args, **kwargs):
+    probe = _course_detail_probe(request, pk)
+    return probe["last_modified"] if probe else None
 
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
+# Shared caches may store catalog responses; Vary keeps them keyed per credential.
+course_http_cache = [
+    vary_on_headers("Authorization"),
+    cache_control(public=True, max_age=settings.COURSE_HTTP_CACHE_MAX_AGE),
+]
 
 
 class CourseViewSet(ModelViewSet):
     queryset = Course.objects.select_related("instructor")
     serializer_class = CourseSerializer
     permission_classes = [IsAuthenticated]
+    throttle_scopes = {
+        "search": "search",
+        "autocomplete": "autocomplete",
+        "enroll": "enroll",
+        "reserve": "enroll",
+    }
 
-    @cache_page(
-        60 * 15, cache="default", key_prefix="course_list_cache"
-    )  # Cache for 15 minutes
+    def get_renderers(self):
+        # CourseRowSerializer output has no floats, so orjson renders it with
+        # the same bytes as JSONRenderer (see FastJSONRenderer)
+        if self.action in ("list", "search"):
+            return [FastJSONRenderer(), BrowsableAPIRenderer()]
+        return super().get_renderers()
+
+    @method_decorator(course_http_cache)
+    @method_decorator(
+        condition(
+            etag_func=course_list_etag, last_modified_func=course_list_last_modified
+        )
+    )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        rows = CourseRowSerializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(CourseRowSerializer(page).data)
+        return Response(CourseRowSerializer(rows).data)
+
+    @method_decorator(course_http_cache)
+    @method_decorator(
+        condition(
+            etag_func=course_detail_etag, last_modified_func=course_detail_last_modified
+        )
+    )
+    def retrieve(self, request, pk=None, *args, **kwargs):
+        data = get_course_detail(request, pk)
+        if data is None:
+            raise NotFound()
+        return Response(data)
+
+    # Object ownership is part of the lookup: an instructor's write to someone
+    # else's course is a 404 from get_object(), with no extra fetch to compare
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ["update", "partial_update", "destroy", "stats"]:
+            if self.request.user.role != "admin":
+                queryset = queryset.filter(instructor=self.request.user)
+        return queryset
+
+    def perform_create(self, serializer):
+        serializer.save(instructor=self.request.user)
 
     # use get_permissions for dynamic permission logic
     def get_permissions(self):
-        if self.action in ["create", "update", "partial_update", "destroy"]:
+        if self.action == "create":
             return [IsInstructor()]
-        elif self.action == "enroll":
+        elif self.action in [
+            "update",
+            "partial_update",
+            "destroy",
+            "stats",
+            "bulk_active",
+        ]:
+            return [(IsInstructor | IsAdmin)()]
+        elif self.action in ["enroll", "reserve", "progress"]:
             return [IsStudent()]
         return [IsAuthenticated()]
 
+    @action(detail=False, methods=["post"], url_path="bulk-active")
+    def bulk_active(self, request):
+        # Authorize every id against the cached ownership set, then one UPDATE
+        serializer = CourseBulkActiveSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        allowed, denied = authorize_course_ids(
+            request.user, serializer.validated_data["ids"]
+        )
+        if denied:
+            return Response(
+                {"error": "Not allowed to modify courses.", "ids": sorted(denied)},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        updated = Course.objects.filter(pk__in=allowed).update(
+            is_active=serializer.validated_data["is_active"],
+            updated_at=timezone.now(),
+        )
+        # update() skips the post_save signal
+        bump_course_generation()
+        course_detail_cache.invalidate(*allowed)
+        return Response({"updated": updated})
+
     @action(detail=True, methods=["post"], url_path="enroll")
     def enroll(self, request, pk=None):
         course = self.get_object()
         data = {"course": course.id, "student": request.user.id}
         serializer = EnrollmentSerializer(data=data, context={"request": request})
-        if serializer.is_valid():
-            serializer.save()
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            with transaction.atomic():
+                if course.capacity is not None:
+                    take_seat(course, request.user)
+                serializer.save(student=request.user)
+        except SeatUnavailable as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except IntegrityError:  # lost the race against a parallel enroll
             return Response(
-                {"message": "Enrolled successfully"}, status=status.HTTP_201_CREATED
+                {"error": "Already enrolled in this course."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {"message": "Enrolled successfully"}, status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=True, methods=["post"], url_path="reserve")
+    def reserve(self, request, pk=None):
+        # Hold a seat in a limited-capacity course while the student checks out
+        course = self.get_object()
+        if course.capacity is None:
+            return Response(
+                {"error": "This course has no seat limit."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            seat = reserve_seat(course, request.user)
+        except SeatUnavailable as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        return Response(
+            {
+                "seat": seat.id,
+                "status": seat.status,
+                "reserved_until": seat.reserved_until,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=True, methods=["get"], url_path="outline")
+    def outline(self, request, pk=None):
+        # Titles and ordering only; lesson bodies are fetched from /lessons/<id>/
+        course = self.get_object()
+        sections = {
+            section["id"]: {**section, "lessons": []}
+            for section in Section.objects.filter(course=course).values(
+                "id", "title", "order"
+            )
+        }
+        lessons = (
+            Lesson.objects.filter(course=course)
+            .order_by("order", "id")
+            .values("id", "section_id", "title", "order")
+        )
+        for lesson in lessons:
+            sections[lesson.pop("section_id")]["lessons"].append(lesson)
+        completed = (
+            Enrollment.objects.filter(student=request.user, course=course)
+            .values_list("completed_lessons", flat=True)
+            .first()
+        )
+        return Response(
+            {
+                "course": course.id,
+                "sections": list(sections.values()),
+                "completed_lessons": completed or [],
+            }
+        )
+
+    @action(detail=True, methods=["post"], url_path="progress")
+    def progress(self, request, pk=None):
+        # Clients batch completed lessons; each call is a single locked UPDATE
+        course = self.get_object()
+        serializer = LessonProgressSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        enrollment = record_progress(
+            request.user, course, serializer.validated_data["lessons"]
+        )
+        if enrollment is None:
+            return Response(
+                {"error": "You are not enrolled in this course."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        return Response(
+            {
+                "status": enrollment.status,
+                "completed_lessons": enrollment.completed_lessons,
+            }
+        )
+
+    @action(detail=True, methods=["get"], url_path="stats")
+    def stats(self, request, pk=None):
+        course = self.get_object()
+        try:
+            days = min(max(int(request.query_params.get("days", 30)), 1), 365)
+        except ValueError:
+            return Response(
+                {"error": 'Query parameter "days" must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        since = timezone.now() - timedelta(days=days)
+        stats = ActivityEvent.objects.filter(
+            course_id=course.id, occurred_at__gte=since
+        ).aggregate(
+            views=Count("id", filter=Q(event_type="lesson_view")),
+            watch_time=Coalesce(Sum("value", filter=Q(event_type="watch_time")), 0),
+            api_requests=Count("id", filter=Q(event_type="api_request")),
+            active_learners=Count(
+                "user_id", distinct=True, filter=~Q(event_type="api_request")
+            ),
+        )
+        return Response({"course": course.id, "days": days, **stats})
 
     @action(detail=False, methods=["get"], url_path="search")
     def search(self, request):
@@ -71,11 +384,222 @@ class CourseViewSet(ModelViewSet):
             .order_by("-rank")
         )
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(CourseRowSerializer(CourseRowSerializer.values(queryset)).data)
+
+    @action(detail=False, methods=["get"], url_path="autocomplete")
+    def autocomplete(self, request):
+        query = request.query_params.get("q", "")
+        if len(query.strip()) < 2:
+            return Response(
+                {"error": 'Query parameter "q" must be at least 2 characters'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(suggest_courses(query))
+
+
+class CourseContentMixin:
+    # Writes to sections/lessons are limited to the owning instructor (or admins),
+    # checked against the cached instructor course-id set instead of a fetch
+    write_actions = ["create", "update", "partial_update", "destroy"]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if self.action in self.write_actions and user.role != "admin":
+            queryset = queryset.filter(course_id__in=get_instructor_course_ids(user.pk))
+        return queryset
+
+    def get_permissions(self):
+        if self.action in self.write_actions:
+            return [(IsInstructor | IsAdmin)()]
+        return [IsAuthenticated()]
+
+    def filter_by_ids(self, queryset, params):
+        # ?course=<id>&section=<id> filters; a non-integer id is a 400, not a 500
+        for param in params:
+            value = self.request.query_params.get(param)
+            if not value:
+                continue
+            try:
+                value = int(value)
+            except ValueError:
+                raise ValidationError({param: ["Must be an integer id."]})
+            queryset = queryset.filter(**{f"{param}_id": value})
+        return queryset
+
+    def check_course_owner(self, course_id):
+        allowed, denied = authorize_course_ids(self.request.user, [course_id])
+        if denied:
+            raise PermissionDenied("You can only edit content of your own courses.")
+
+    def perform_create(self, serializer):
+        self.check_course_owner(self.get_course_id(serializer))
+        serializer.save()
+
+    def perform_update(self, serializer):
+        self.check_course_owner(self.get_course_id(serializer))
+        serializer.save()
+
+
+class SectionViewSet(CourseContentMixin, ModelViewSet):
+    queryset = Section.objects.all()
+    serializer_class = SectionSerializer
+
+    def get_queryset(self):
+        return self.filter_by_ids(super().get_queryset(), ["course"])
+
+    def get_course_id(self, serializer):
+        course = serializer.validated_data.get("course")
+        return course.id if course else serializer.instance.course_id
+
+
+class LessonViewSet(CourseContentMixin, ModelViewSet):
+    queryset = Lesson.objects.select_related("course")
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "list":
+            queryset = queryset.defer("body")  # outline only, bodies on retrieve
+            queryset = self.filter_by_ids(queryset, ["course", "section"])
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return LessonOutlineSerializer
+        return LessonSerializer
+
+    def retrieve(self, request, *args, **kwargs):
+        lesson = self.get_object()
+        record_event("lesson_view", request.user.id, lesson.course_id, lesson.id)
+        return Response(self.get_serializer(lesson).data)
+
+    def get_permissions(self):
+        if self.action == "retrieve":
+            return [IsAuthenticated(), CanViewLesson()]
+        return super().get_permissions()
+
+    def get_course_id(self, serializer):
+        section = serializer.validated_data.get("section")
+        return section.course_id if section else serializer.instance.course_id
+
+
+class DashboardView(APIView):
+    permission_classes = [IsStudent]
+
+    def get(self, request):
+        # One row per enrollment: progress lives in an array, not a row per lesson
+        enrollments = (
+            Enrollment.objects.filter(student=request.user)
+            .annotate(total_lessons=Count("course__lessons"))
+            .values(
+                "course_id",
+                "course__title",
+                "status",
+                "enrollment_date",
+                "completed_lessons",
+                "total_lessons",
+            )
+            .order_by("-enrollment_date")
+        )
+        return Response(
+            [
+                {
+                    "course": row["course_id"],
+                    "title": row["course__title"],
+                    "status": row["status"],
+                    "enrollment_date": row["enrollment_date"],
+                    "completed_lessons": len(row["completed_lessons"]),
+                    "total_lessons": row["total_lessons"],
+                }
+                for row in enrollments
+            ]
+        )
+
+
+class ActivityEventView(APIView):
+    throttle_scope = "events"
+
+    # Buffered in a Redis stream and written to Postgres in batches by Celery,
+    # so ingestion costs one Redis round-trip and no INSERT on the request path
+    def post(self, request):
+        serializer = ActivityBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        events = serializer.validated_data["events"]
+        error = self.check_events(request.user, events)
+        if error is not None:
+            return error
+        events = [{**event, "user": request.user.id} for event in events]
+        accepted = record_events(events)
+        return Response(
+            {"accepted": accepted, "dropped": len(events) - accepted},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    def check_events(self, user, events):
+        # Checked once per batch (plus one query when lessons are reported): events
+        # only count for courses the caller is enrolled in, and a lesson has to
+        # belong to the course it is reported against
+        course_ids = {event["course"] for event in events}
+        enrolled = set(
+            Enrollment.objects.filter(
+                student=user, course_id__in=course_ids
+            ).values_list("course_id", flat=True)
+        )
+        if course_ids - enrolled:
+            return Response(
+                {
+                    "error": "Not enrolled in these courses.",
+                    "ids": sorted(course_ids - enrolled),
+                },
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        pairs = {
+            (event["lesson"], event["course"])
+            for event in events
+            if event.get("lesson")
+        }
+        if pairs:
+            lesson_courses = dict(
+                Lesson.objects.filter(
+                    pk__in={lesson_id for lesson_id, _ in pairs}
+                ).values_list("pk", "course_id")
+            )
+            invalid = {
+                lesson_id
+                for lesson_id, course_id in pairs
+                if lesson_courses.get(lesson_id) != course_id
+            }
+            if invalid:
+                return Response(
+                    {
+                        "error": "Lessons not found in the given course.",
+                        "ids": sorted(invalid),
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        return None
+
+
+class ActivityMetricsView(APIView):
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response(stream_metrics())
+
+
+class CacheStatsView(APIView):
+    # Counters are per process: each worker reports its own tiers
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response({"course_detail": course_detail_cache.stats()})
 
 
 class RegisterView(APIView):
+    permission_classes = [AllowAny]
+    throttle_scope = "login"
+
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
@@ -93,6 +617,9 @@ class RegisterView(APIView):
 
 
 class LoginView(APIView):
+    permission_classes = [AllowAny]
+    throttle_scope = "login"
+
     def post(self, request):
         email = request.data.get("email")
         password = request.data.get("password")
@@ -116,46 +643,198 @@ class LoginView(APIView):
         )
 
 
+class BulkProvisionView(APIView):
+    permission_classes = [IsAdmin]
+
+    def post(self, request):
+        # JSON {"users": [...], "course_ids": [...]} or a multipart CSV upload
+        # (columns: email, username, role, bio) in "file" with course_ids fields
+        upload = request.FILES.get("file")
+        if upload:
+            data = {
+                "users": list(
+                    csv.DictReader(io.TextIOWrapper(upload, encoding="utf-8-sig"))
+                ),
+                "course_ids": request.data.getlist("course_ids"),
+            }
+        else:
+            data = request.data
+        serializer = BulkProvisionSerializer(data=data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        users = serializer.validated_data["users"]
+        existing_emails, existing_usernames = find_existing(users)
+        rows = [
+            row
+            for row in users
+            if row["email"] not in existing_emails
+            and row["username"] not in existing_usernames
+        ]
+        job = ProvisioningJob.objects.create(
+            created_by=request.user,
+            rows=rows,
+            course_ids=serializer.validated_data["course_ids"],
+            total=len(rows),
+            skipped=len(users) - len(rows),
+        )
+        transaction.on_commit(lambda: provision_users.delay(job.id))
+        return Response(
+            ProvisioningJobSerializer(job).data, status=status.HTTP_202_ACCEPTED
+        )
+
+
+class ProvisioningJobView(APIView):
+    permission_classes = [IsAdmin]
+
+    def get(self, request, pk):
+        job = ProvisioningJob.objects.defer("rows").filter(pk=pk).first()
+        if job is None:
+            return Response(
+                {"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(ProvisioningJobSerializer(job).data)
+
+    def post(self, request, pk):
+        # Resume a failed or stalled job from its last committed chunk; a job that
+        # is still making progress can't be queued a second time
+        updated = (
+            ProvisioningJob.objects.filter(pk=pk)
+            .filter(
+                Q(status="failed")
+                | Q(status__in=["pending", "running"], updated_at__lt=stalled_before())
+            )
+            .update(status="pending", error="", updated_at=timezone.now())
+        )
+        if not updated:
+            return Response(
+                {"error": "Job not found, completed or still running"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        provision_users.delay(pk)
+        return Response({"message": "Job resumed"}, status=status.HTTP_202_ACCEPTED)
+
+
+class SetPasswordView(APIView):
+    # Completes an invite from bulk provisioning (uid/token from the email link)
+    permission_classes = [AllowAny]
+    throttle_scope = "login"
+
+    def post(self, request):
+        serializer = SetPasswordSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        user = serializer.validated_data["user"]
+        user.set_password(serializer.validated_data["password"])
+        user.save(update_fields=["password"])
+        return Response({"message": "Password set successfully"})
+
+
 class PaymentView(APIView):
     permission_classes = [IsStudent]
+    throttle_scope = "pay"
 
     def post(self, request):
         course_id = request.data.get("course_id")
         token = request.data.get("stripe_token")  # from frontend (e.g. Stripe.js)
+        try:
+            stripe = get_stripe()
+        except ImproperlyConfigured:
+            return Response(
+                {"error": "Payments are not configured."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
 
         try:
             course = Course.objects.get(id=course_id, is_active=True)
+        except Course.DoesNotExist:
+            return Response(
+                {"error": "Course not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        if Enrollment.objects.filter(student=request.user, course=course).exists():
+            return Response(
+                {"error": "Already enrolled in this course."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # The pending Payment row is the purchase claim (one open payment per
+        # student and course). It stays locked for the whole checkout, so a
+        # concurrent request for the same course backs off instead of charging
+        # again. A crashed attempt leaves it pending; the retry reuses it and its
+        # idempotency key, so Stripe returns the original charge.
+        try:
+            with transaction.atomic():
+                Payment.objects.create(
+                    user=request.user,
+                    course=course,
+                    amount=course.price,
+                    status="pending",
+                )
+        except IntegrityError:
+            pass  # claimed by an earlier attempt
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    payment = (
+                        Payment.objects.select_for_update(nowait=True)
+                        .filter(user=request.user, course=course, status="pending")
+                        .first()
+                    )
+            except OperationalError:
+                return Response(
+                    {"error": "A payment for this course is already in progress."},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            if payment is None:
+                return Response(
+                    {"error": "This course has already been paid for."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            return self.checkout(stripe, payment, course, token)
+
+    def checkout(self, stripe, payment, course, token):
+        # Runs inside the transaction holding the payment claim's row lock
+        try:
+            if course.capacity is not None:
+                reserve_seat(course, payment.user)  # hold (or extend) before charging
             charge = stripe.Charge.create(
                 amount=int(course.price * 100),  # convert to cents
                 currency="usd",
                 source=token,
                 description=f"Payment for {course.title}",
+                idempotency_key=f"payment-{payment.pk}",
             )
-            payment = Payment.objects.create(
-                user=request.user,
-                course=course,
-                amount=course.price,
-                stripe_payment_id=charge.id,
-                status="completed",
-            )
-            # Auto-enroll after successful payment
-            Enrollment.objects.create(student=request.user, course=course)
-            # Trigger async email
-            send_payment_confirmation_email.delay(request.user.email, course.title)
-            return Response(
-                {"message": "Payment and enrollment successful"},
-                status=status.HTTP_201_CREATED,
-            )
-        except Course.DoesNotExist:
-            return Response(
-                {"error": "Course not found"}, status=status.HTTP_404_NOT_FOUND
-            )
+        except SeatUnavailable as e:
+            payment.status = "failed"
+            payment.save(update_fields=["status"])
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
         except stripe.error.StripeError as e:
-            Payment.objects.create(
-                user=request.user,
-                course=course,
-                amount=course.price,
-                strip_payment_id="",
-                status="failed",
-            )
+            payment.status = "failed"
+            payment.save(update_fields=["status"])
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            if course.capacity is not None:
+                take_seat(course, payment.user)
+        except SeatUnavailable as e:
+            # Hold lapsed mid-checkout and the seat was resold: refund, no oversell
+            stripe.Refund.create(charge=charge.id)
+            payment.status = "failed"
+            payment.stripe_payment_id = charge.id
+            payment.save(update_fields=["status", "stripe_payment_id"])
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        payment.status = "completed"
+        payment.stripe_payment_id = charge.id
+        payment.save(update_fields=["status", "stripe_payment_id"])
+        # Auto-enroll after successful payment
+        Enrollment.objects.get_or_create(student=payment.user, course=course)
+        # Trigger async email
+        transaction.on_commit(
+            lambda: send_payment_confirmation_email.delay(
+                payment.user.email, course.title
+            )
+        )
+        return Response(
+            {"message": "Payment and enrollment successful"},
+            status=status.HTTP_201_CREATED,
+        )
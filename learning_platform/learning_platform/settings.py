@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     "core",
@@ -51,6 +52,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.middleware.CourseApiActivityMiddleware",
 ]
 
 REST_FRAMEWORK = {
@@ -61,6 +63,30 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",  # Require authentication by default
     ],
+    "DEFAULT_THROTTLE_CLASSES": [
+        "core.throttling.RoleRateThrottle",  # rates in ROLE_THROTTLE_RATES
+    ],
+    # Proxies in front of the app that append to X-Forwarded-For. Anonymous
+    # throttle keys use the address that many hops from the right; with 0 they
+    # use REMOTE_ADDR, so a client-supplied X-Forwarded-For can't rotate them.
+    "NUM_PROXIES": config("NUM_PROXIES", default=0, cast=int),
+}
+
+# Per-scope, per-role request rates for core.throttling.RoleRateThrottle.
+# Roles missing from a scope use the "default" scope; None means unthrottled.
+ROLE_THROTTLE_RATES = {
+    "default": {
+        "anon": "60/min",
+        "student": "600/min",
+        "instructor": "1200/min",
+        "admin": None,
+    },
+    "search": {"anon": "20/min", "student": "60/min", "instructor": "120/min"},
+    "autocomplete": {"student": "300/min", "instructor": "300/min"},  # per keystroke
+    "enroll": {"student": "10/min"},
+    "pay": {"student": "5/min"},
+    "login": {"anon": "10/min"},
+    "events": {"student": "120/min", "instructor": "120/min"},
 }
 
 ROOT_URLCONF = "learning_platform.urls"
@@ -147,15 +173,62 @@ CACHES = {
         "LOCATION": "redis://127.0.0.1:6379/1",
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            # Fail fast: request-path Redis calls (cache, activity events) must not hang
+            "SOCKET_CONNECT_TIMEOUT": 1,
+            "SOCKET_TIMEOUT": 1,
         },
     }
 }
 
-STRIPE_SECRET_KEY = config("STRIPE_SECRET_KEY")
-STRIPE_PUBLISHABLE_KEY = config("STRIPE_PUBLISHABLE_KEY")
+# Autocomplete: bounded per-process LRU of hot prefixes, invalidated on course writes
+COURSE_AUTOCOMPLETE_LIMIT = 10
+COURSE_AUTOCOMPLETE_CACHE_SIZE = 2048
+COURSE_AUTOCOMPLETE_CACHE_TTL = 60  # seconds
+
+# Cache-Control max-age for course list/detail (revalidated with ETag/Last-Modified)
+COURSE_HTTP_CACHE_MAX_AGE = 60  # seconds
+
+# Course detail: per-process LRU (L1) in front of Redis (L2). Writes evict L1 in
+# every process via pub/sub; the L1 TTL bounds staleness if a broadcast is missed.
+COURSE_DETAIL_L1_SIZE = 512
+COURSE_DETAIL_L1_TTL = 10  # seconds
+COURSE_DETAIL_L2_TTL = 60 * 15  # seconds
+
+# How long a limited-capacity seat is held during checkout
+SEAT_RESERVATION_TTL = 60 * 15  # seconds
+
+# Activity events: Redis stream buffer drained into Postgres by Celery beat
+ACTIVITY_STREAM_MAXLEN = 1_000_000  # oldest undrained events are trimmed past this
+ACTIVITY_DRAIN_BATCH = 5000
+
+# Bulk user provisioning: users per transaction, and the frontend page that
+# receives ?uid=&token= from the invite email
+BULK_PROVISION_CHUNK = 1000
+BULK_PROVISION_STALL_TIMEOUT = 60 * 10  # seconds without a committed chunk
+PASSWORD_SETUP_URL = config(
+    "PASSWORD_SETUP_URL", default="http://localhost:3000/set-password"
+)
+
+# Optional at startup: core.payments.get_stripe() checks the key on first charge
+STRIPE_SECRET_KEY = config("STRIPE_SECRET_KEY", default="")
+STRIPE_PUBLISHABLE_KEY = config("STRIPE_PUBLISHABLE_KEY", default="")
 
 CELERY_BROKER_URL = "redis://127.0.0.1:6379/1"
 CELERY_RESULT_BACKEND = "redis://127.0.0.1:6379/1"
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
+CELERY_BEAT_SCHEDULE = {
+    "release-expired-seats": {
+        "task": "core.tasks.release_expired_seats",
+        "schedule": 60.0,
+    },
+    "drain-activity-events": {
+        "task": "core.tasks.drain_activity_events",
+        "schedule": 5.0,
+    },
+    "ensure-activity-partitions": {
+        "task": "core.tasks.ensure_activity_partitions",
+        "schedule": 60.0 * 60 * 24,
+    },
+}